@@ -1,7 +1,9 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
+from flask import Blueprint, current_app, render_template, request, flash, redirect, url_for, session, jsonify
 from .models import Tournament,Team,Match, Coach, Player, MatchEvent, Referee
 from . import db
-from .services.create import create_player, create_tournament, create_team, create_match, create_match_event, create_referee
+from .services.create import create_player, create_tournament, create_team, create_match, create_match_events, create_referee
+from .services.match import finish_matchday
+import json
 from flask_login import login_user, login_required, logout_user, current_user
 from collections import defaultdict
 
@@ -131,27 +133,32 @@ def delete_team():
 @admin.route('/create-tournament', methods=['GET', 'POST'])
 @login_required
 def tournament_adder():
+    leagues = Tournament.query.filter_by(type='league').order_by(Tournament.name).all()
     if request.method == 'POST':
         tournamentName = request.form.get('tournamentName')
         tournamentType = request.form.get('tournamentType')
+        legs = request.form.get('legs', 2)
         numTeams = request.form.get('numTeams')  # Liczba drużyn
         numTeams = int(numTeams)
+        # Play-off: opcjonalne ziarno losowania i liga, z której tabeli brane jest rozstawienie
+        drawSeed = request.form.get('drawSeed', type=int)
+        seedingTournamentId = request.form.get('seedingTournament_id', type=int)
+        # Grupy + play-off: liczba grup i liczba druzyn awansujacych z kazdej grupy
+        groups = request.form.get('groups', type=int)
+        advancing = request.form.get('advancing', type=int)
         if not tournamentName or not tournamentType or not numTeams or numTeams < 2:
             flash('Wszystkie pola są wymagane!', 'danger')
-            return render_template('create_tournament.html', user=current_user)
-        
-        if tournamentType == 'Turniej pucharowy' and (numTeams <= 0 or (numTeams & (numTeams - 1)) != 0):
-            flash('Ilość druzyn w turnieju PLAY-OFF musi być potęgą liczby 2!', 'danger')
-            return render_template('create_tournament.html', user=current_user)
-        
+            return render_template('create_tournament.html', user=current_user, leagues=leagues)
+
         try:  
-            new_tournament = create_tournament(tournamentName,tournamentType, 'planned')
+            new_tournament = create_tournament(tournamentName,tournamentType, 'planned', legs,
+                                               drawSeed, seedingTournamentId, groups, advancing)
             flash('Turniej został pomyślnie dodany!', 'success')
             return redirect(url_for('admin.teams_to_tournament_adder', numTeams=numTeams, tournament_id=new_tournament.id))
         except ValueError as e:
             flash(str(e), 'danger')
-            return render_template("create_tournament.html", user=current_user)
-    return render_template("create_tournament.html", user=current_user)
+            return render_template("create_tournament.html", user=current_user, leagues=leagues)
+    return render_template("create_tournament.html", user=current_user, leagues=leagues)
 
 @admin.route('/add-teams-to-tournament', methods=['GET', 'POST'])
 @login_required
@@ -257,18 +264,6 @@ def delete_tournament(tournament_id):
         flash(str(e), 'danger')
         return redirect(url_for('admin.home_admin'))
     
-@admin.route('/draw-next-round/<int:tournament_id>', methods=['POST'])
-@login_required
-def draw_next_round(tournament_id):
-    # Obsługa losowania kolejnej rundy
-    tournament = Tournament.find_tournament_by_id(tournament_id)
-    try:
-        Tournament.generate_next_round(tournament)
-        return redirect(url_for('admin.home_admin'))
-    except ValueError as e:
-        flash(str(e), 'danger')
-        return redirect(url_for('admin.home_admin'))
-    
 @admin.route('/choose-match-to-manage', methods=['GET', 'POST'])
 @login_required
 def choose_match_to_manage():
@@ -367,33 +362,32 @@ def match_event_adder():
 
     if request.method == "POST":
         try:
-            # Dodaj strzelców goli dla drużyny gospodarzy
+            # Zbieramy cały protokół z formularza i zapisujemy go jedną transakcją
+            events = []
+
+            # Strzelcy goli dla drużyny gospodarzy
             for i in range(match.scoreHome):
                 player_id = request.form.get(f'home_scorer_{i}', type=int)
                 if not player_id:
                     raise ValueError(f"Nie wybrano strzelca dla gola {i + 1} drużyny {match.home_team.name}")
-                
-                create_match_event('goal', match_id, player_id)
+                events.append(('goal', player_id))
 
-            # Dodaj strzelców goli dla drużyny gości
+            # Strzelcy goli dla drużyny gości
             for i in range(match.scoreAway):
                 player_id = request.form.get(f'away_scorer_{i}', type=int)
                 if not player_id:
                     raise ValueError(f"Nie wybrano strzelca dla gola {i + 1} drużyny {match.away_team.name}")
-                
-                create_match_event('goal', match_id, player_id)
+                events.append(('goal', player_id))
 
-                # Dodaj czerwone kartki
+            # Czerwone kartki
             for i in range(redCardsNum):
                 player_id = request.form.get(f'red_card_{i}', type=int)
                 if not player_id:
                     raise ValueError(f"Nie wybrano zawodnika dla czerwonej kartki {i + 1}")
-                
-                create_match_event('redCard', match_id, player_id)
+                events.append(('redCard', player_id))
 
-
-            match.status = 'ended'
-            db.session.commit()
+            # Zdarzenia + zakończenie meczu (status 'ended', tabela ligowa) w jednym commicie
+            create_match_events(match_id, events, end_match=True)
 
             flash("Zdarzenia meczu zostały pomyślnie dodane. ", "success")
             return redirect(url_for('admin.home_admin'))
@@ -406,6 +400,46 @@ def match_event_adder():
     return render_template(
         'add_goal_scorers.html',user=current_user, match=match, redCardsNum=redCardsNum)
 
+# Telemetria puli połączeń z bazą (JSON) - tylko dla admina
+@admin.route('/metrics/pool')
+@login_required
+def pool_metrics():
+    if not session.get('is_admin'):
+        return jsonify(error='Brak uprawnień.'), 403
+    return jsonify(current_app.extensions['pool_metrics'].snapshot(db.engine.pool))
+
+# Wprowadzanie wyników całej kolejki naraz (JSON w body, plik JSON albo pole formularza)
+@admin.route('/finish-matchday', methods=['GET', 'POST'])
+@login_required
+def matchday_finisher():
+    if request.method == 'POST':
+        try:
+            if request.is_json:
+                records = request.get_json(silent=True)
+            else:
+                upload = request.files.get('results_file')
+                raw = upload.read() if upload and upload.filename else request.form.get('results')
+                if not raw:
+                    raise ValueError('Wklej wyniki albo wybierz plik!')
+                try:
+                    records = json.loads(raw)
+                except ValueError:
+                    raise ValueError('Nieprawidłowy format JSON!')
+
+            finished = finish_matchday(records)
+        except ValueError as e:
+            if request.is_json:
+                return jsonify(error=str(e)), 400
+            flash(str(e), 'danger')
+            return render_template('finish_matchday.html', user=current_user)
+
+        if request.is_json:
+            return jsonify(finished=[match.id for match in finished])
+        flash(f'Zapisano wyniki {len(finished)} meczów!', 'success')
+        return redirect(url_for('admin.home_admin'))
+
+    return render_template('finish_matchday.html', user=current_user)
+
 # Dodawanie zawodnika do bazy
 @admin.route('/new-referee', methods=['GET', 'POST']) 
 @login_required  # Wymagane zalogowanie użytkownika
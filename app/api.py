@@ -0,0 +1,261 @@
+import json
+from functools import partial
+
+from flask import Blueprint, current_app, request
+from sqlalchemy.orm import joinedload
+
+from .models import Tournament, Team, Match, MatchEvent, Player, PlayerTournamentStats, Referee, BracketSlot
+from . import db
+from .cache import cached, conditional
+from .services.pagination import paginate, page_size
+from .services.serializers import (tournament_serializer, team_serializer, player_serializer,
+                                   match_serializer, event_serializer, slot_serializer)
+from .services.tournament import calculate_tables, group_matches_by_round
+from .services.view_models import tournament_revision, team_revision, match_revision, leader_rows
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api = Blueprint('api', __name__)
+
+
+# Odpowiedzi ---------------------------------------------------------------------------------------------------------
+
+def _dumps(payload):
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def json_response(payload, status=200):
+    return current_app.response_class(_dumps(payload), status=status, mimetype='application/json')
+
+
+def error(message, status=400):
+    return json_response({"error": message}, status)
+
+
+def _fields(serializer):
+    return serializer.select(request.args.get('fields'))
+
+
+def _preload(model, ids):
+    # Jedno zapytanie IN - relacje wiele-do-jednego beda potem brane z identity map sesji
+    ids = {id for id in ids if id is not None}
+    if ids:
+        model.query.filter(model.id.in_(ids)).all()
+
+
+def _list(serializer, getter, sort_by, prepare=None):
+    """Strona listy zasobu (paginacja kursorami ?after= / ?before= i ?per_page=)."""
+    try:
+        fields = _fields(serializer)
+        page = paginate(getter, sort_by)
+    except ValueError as e:
+        return error(str(e))
+
+    if prepare:
+        prepare(page.items)
+
+    return json_response({
+        "data": serializer.dump_many(page.items, fields),
+        "next": page.next_cursor,
+        "prev": page.prev_cursor,
+    })
+
+
+def _detail(serializer, obj):
+    try:
+        fields = _fields(serializer)
+    except ValueError as e:
+        return error(str(e))
+    return json_response({"data": serializer.dump(obj, fields)})
+
+
+def _prepare_matches(matches):
+    _preload(Team, [id for match in matches for id in (match.homeTeam_id, match.awayTeam_id)])
+    _preload(Referee, [match.referee_id for match in matches])
+
+
+# Turnieje -----------------------------------------------------------------------------------------------------------
+
+@api.route('/tournaments')
+def tournaments():
+    return _list(tournament_serializer, Tournament.get_tournaments, "name")
+
+
+@api.route('/tournaments/<int:tournament_id>')
+@conditional(tournament_revision)
+def tournament(tournament_id):
+    tournament = db.session.get(Tournament, tournament_id)
+    if not tournament:
+        return error("Turniej nie istnieje.", 404)
+    return _detail(tournament_serializer, tournament)
+
+
+@api.route('/tournaments/<int:tournament_id>/standings')
+@conditional(tournament_revision)
+def standings(tournament_id):
+    if not db.session.get(Tournament, tournament_id):
+        return error("Turniej nie istnieje.", 404)
+    try:
+        tables = calculate_tables(tournament_id)
+    except ValueError as e:
+        return error(str(e))
+
+    # Liga to grupa 0; w turnieju grupowym miejsca sa liczone w obrebie grupy
+    return json_response({"data": [
+        {"group": group, "position": position, "team": {"id": row.team.id, "name": row.team.name},
+         "played": row.played, "wins": row.wins, "draws": row.draws, "losses": row.losses,
+         "goalsFor": row.goalsFor, "goalsAgainst": row.goalsAgainst, "points": row.points}
+        for group, rows in tables.items()
+        for position, row in enumerate(rows, start=1)
+    ]})
+
+
+@api.route('/tournaments/<int:tournament_id>/matches')
+@conditional(tournament_revision)
+def tournament_matches(tournament_id):
+    tournament = db.session.get(Tournament, tournament_id)
+    if not tournament:
+        return error("Turniej nie istnieje.", 404)
+
+    # ?round= to kolejka fazy grupowej; mecze drabinki zwraca /bracket
+    round = request.args.get('round', type=int)
+    getter = partial(Match.get_tournament_matches, tournament_id, round,
+                     round is not None and tournament.type == 'groups_playoff')
+    return _list(match_serializer, getter, "id", prepare=_prepare_matches)
+
+
+@api.route('/tournaments/<int:tournament_id>/bracket')
+@conditional(tournament_revision)
+def bracket(tournament_id):
+    tournament = db.session.get(Tournament, tournament_id)
+    if not tournament:
+        return error("Turniej nie istnieje.", 404)
+    if tournament.type not in ('playoff', 'groups_playoff'):
+        return error("Drabinka istnieje tylko w turnieju play-off.")
+    try:
+        fields = _fields(slot_serializer)
+    except ValueError as e:
+        return error(str(e))
+
+    rounds = group_matches_by_round(BracketSlot.get_bracket(tournament_id))
+    return json_response({"data": [
+        {"round": round, "slots": slot_serializer.dump_many(slots, fields)}
+        for round, slots in rounds.items()
+    ]})
+
+
+@api.route('/tournaments/<int:tournament_id>/leaderboard')
+@conditional(tournament_revision)
+def tournament_leaderboard(tournament_id):
+    """Ranking zawodnikow turnieju: ?stat=goals (domyslnie) albo ?stat=redCards, ?per_page=."""
+    if not db.session.get(Tournament, tournament_id):
+        return error("Turniej nie istnieje.", 404)
+    try:
+        leaders = PlayerTournamentStats.leaderboard(
+            request.args.get('stat', 'goals'), tournament_id, page_size())
+    except ValueError as e:
+        return error(str(e))
+    return json_response({"data": leader_rows(leaders)})
+
+
+@api.route('/leaderboard')
+def leaderboard():
+    """Ranking zawodnikow ze wszystkich turniejow (cache uniewazniany przy zapisie zdarzen)."""
+    stat = request.args.get('stat', 'goals')
+    n = page_size()
+
+    def build():
+        rows = leader_rows(PlayerTournamentStats.leaderboard(stat, None, n))
+        return rows, {"leaderboard", *(f"player:{row['player']['id']}" for row in rows)}
+
+    try:
+        rows = cached(f"leaderboard:{stat}:{n}", build)
+    except ValueError as e:
+        return error(str(e))
+    return json_response({"data": rows})
+
+
+# Mecze i zdarzenia ----------------------------------------------------------------------------------------------------
+
+@api.route('/matches')
+def matches():
+    return _list(match_serializer, Match.get_matches, "id", prepare=_prepare_matches)
+
+
+@api.route('/matches/<int:match_id>')
+@conditional(match_revision)
+def match(match_id):
+    match = Match.query.options(
+        joinedload(Match.home_team), joinedload(Match.away_team), joinedload(Match.referee)
+    ).filter(Match.id == match_id).first()
+    if not match:
+        return error("Mecz nie istnieje.", 404)
+    return _detail(match_serializer, match)
+
+
+@api.route('/matches/<int:match_id>/events')
+@conditional(match_revision)
+def match_events(match_id):
+    if not db.session.get(Match, match_id):
+        return error("Mecz nie istnieje.", 404)
+    try:
+        fields = _fields(event_serializer)
+    except ValueError as e:
+        return error(str(e))
+
+    events = MatchEvent.query.filter(MatchEvent.match_id == match_id).order_by(MatchEvent.id.asc()).all()
+    return json_response({"data": event_serializer.dump_many(events, fields)})
+
+
+@api.route('/events')
+def events():
+    return _list(event_serializer, MatchEvent.get_match_events, "id")
+
+
+# Druzyny i zawodnicy --------------------------------------------------------------------------------------------------
+
+@api.route('/teams')
+def teams():
+    return _list(team_serializer, Team.get_teams, "name")
+
+
+@api.route('/teams/<int:team_id>')
+@conditional(team_revision)
+def team(team_id):
+    team = db.session.get(Team, team_id)
+    if not team:
+        return error("Drużyna nie istnieje.", 404)
+    return _detail(team_serializer, team)
+
+
+@api.route('/teams/<int:team_id>/players')
+@conditional(team_revision)
+def team_players(team_id):
+    if not db.session.get(Team, team_id):
+        return error("Drużyna nie istnieje.", 404)
+    try:
+        fields = _fields(player_serializer)
+    except ValueError as e:
+        return error(str(e))
+
+    players = Player.query.filter(Player.team_id == team_id).order_by(
+        Player.lastName.asc(), Player.id.asc()).all()
+    return json_response({"data": player_serializer.dump_many(players, fields)})
+
+
+@api.route('/players')
+def players():
+    return _list(player_serializer, Player.get_players, "lastName")
+
+
+@api.route('/players/<int:player_id>')
+def player(player_id):
+    player = db.session.get(Player, player_id)
+    if not player:
+        return error("Zawodnik nie istnieje.", 404)
+    return _detail(player_serializer, player)
@@ -0,0 +1,254 @@
+"""
+Cache modeli widokow (slownikow przekazywanych do szablonow) dla stron publicznych.
+
+Kazdy wpis ma zestaw tagow typu "team:5", "match:12". Po commicie, ktory zmienil
+obiekt modelu, uniewazniane sa dokladnie wpisy z tagami zwroconymi przez jego
+metode cache_tags(). Zapytania masowe (UPDATE/INSERT z pominieciem ORM) zglaszaja
+tagi recznie przez mark_stale().
+
+Dekorator conditional() obsluguje warunkowy GET (ETag / If-None-Match) na podstawie
+wersji danych strony.
+"""
+import hashlib
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, has_app_context, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import db
+
+
+class LRUCache:
+    """Cache w pamieci procesu: LRU z limitem wpisow i czasem zycia (TTL)."""
+
+    def __init__(self, max_entries=1024, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()  # klucz -> (wygasa, wartosc, tagi)
+        self._by_tag = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value, _ = entry
+            if expires < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags=(), ttl=None):
+        expires = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires, value, frozenset(tags))
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_tags(self, tags):
+        with self._lock:
+            for tag in tags:
+                for key in self._by_tag.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+class MemcachedCache:
+    """
+    Cache w lokalnym memcached (klient zgodny z pymemcache).
+    Tagi realizowane sa licznikami wersji: wpis pamieta wersje swoich tagow
+    z chwili zapisu, a uniewaznienie tagu to zwiekszenie jego licznika.
+    """
+
+    def __init__(self, servers='127.0.0.1:11211', default_ttl=300, prefix='turniej:'):
+        try:
+            from pymemcache.client.hash import HashClient
+        except ImportError:
+            raise RuntimeError(
+                "CACHE_BACKEND='memcached' wymaga pakietu pymemcache.")
+        hosts = []
+        for server in servers.split(','):
+            host, _, port = server.strip().partition(':')
+            hosts.append((host, int(port or 11211)))
+        self.client = HashClient(hosts, ignore_exc=True)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def _tag_key(self, tag):
+        return f"{self.prefix}tag:{tag}"
+
+    def _tag_versions(self, tags):
+        keys = [self._tag_key(tag) for tag in tags]
+        found = self.client.get_many(keys) if keys else {}
+        return {tag: int(found.get(key) or 0) for tag, key in zip(tags, keys)}
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        versions, value = pickle.loads(raw)
+        if versions and self._tag_versions(list(versions)) != versions:
+            return None
+        return value
+
+    def set(self, key, value, tags=(), ttl=None):
+        raw = pickle.dumps((self._tag_versions(list(tags)), value))
+        self.client.set(self.prefix + key, raw, expire=ttl or self.default_ttl)
+
+    def invalidate_tags(self, tags):
+        for tag in tags:
+            key = self._tag_key(tag)
+            if self.client.incr(key, 1) is None:
+                self.client.set(key, b'1')
+
+    def clear(self):
+        self.client.flush_all()
+
+
+class NullCache:
+    """Wylaczony cache - kazde zapytanie buduje model widoku od nowa."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, tags=(), ttl=None):
+        pass
+
+    def invalidate_tags(self, tags):
+        pass
+
+    def clear(self):
+        pass
+
+
+def init_cache(app):
+    backend = app.config.get('CACHE_BACKEND', 'lru')
+    ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+
+    if backend == 'lru':
+        cache = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024), ttl)
+    elif backend == 'memcached':
+        cache = MemcachedCache(app.config.get('CACHE_MEMCACHED_SERVERS', '127.0.0.1:11211'), ttl)
+    elif backend == 'null':
+        cache = NullCache()
+    else:
+        raise ValueError(f"Nieznany backend cache: {backend}")
+
+    app.extensions['view_cache'] = cache
+    return cache
+
+
+def get_cache():
+    return current_app.extensions['view_cache']
+
+
+def cached(key, builder):
+    """
+    Zwraca model widoku z cache albo buduje go funkcja builder(), ktora zwraca
+    pare (wartosc, tagi). Wartosc None (np. brak obiektu) nie jest zapamietywana.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    value, tags = builder()
+    if value is not None:
+        cache.set(key, value, tags)
+    return value
+
+
+# Uniewaznianie --------------------------------------------------------------------------------------------------
+
+def mark_stale(*tags):
+    """Zglasza tagi do uniewaznienia po commicie - dla zapytan masowych z pominieciem ORM."""
+    db.session.info.setdefault('stale_cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_tags(session, flush_context):
+    tags = session.info.setdefault('stale_cache_tags', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        cache_tags = getattr(obj, 'cache_tags', None)
+        if cache_tags is not None:
+            tags.update(cache_tags())
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    tags = session.info.pop('stale_cache_tags', None)
+    if tags and has_app_context() and 'view_cache' in current_app.extensions:
+        get_cache().invalidate_tags(tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_tags_after_rollback(session):
+    session.info.pop('stale_cache_tags', None)
+
+
+# Warunkowy GET ---------------------------------------------------------------------------------------------------
+
+def _etag(version):
+    # Pasek nawigacji zalezy od zalogowanego uzytkownika - kazdy ma wlasny ETag
+    user = current_user.get_id() if current_user.is_authenticated else ''
+    raw = f"{version}|{user}|{int(bool(session.get('is_admin')))}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def conditional(version):
+    """
+    Dekorator widoku: strong ETag z wersji danych strony. version(**view_args) zwraca
+    wersje (np. revision z bazy) albo None, gdy obiektu nie ma - wtedy widok dziala
+    normalnie. Przy zgodnym If-None-Match odpowiada 304 bez budowania i renderowania strony.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            # Strona z komunikatem flash jest jednorazowa - nie moze trafic do cache przegladarki
+            if request.method not in ('GET', 'HEAD') or session.get('_flashes'):
+                return view(**kwargs)
+
+            current = version(**kwargs)
+            if current is None:
+                return view(**kwargs)
+
+            etag = _etag(current)
+            if etag in request.if_none_match:
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,61 @@
+import click
+
+from .models import PlayerTournamentStats
+from .services.query_plans import check_query_plans
+from .services.search import rebuild_search_names
+from .services.tournament import rebuild_standings
+
+
+def register_commands(app):
+
+    # flask rebuild-standings [--tournament-id ID]
+    @app.cli.command('rebuild-standings')
+    @click.option('--tournament-id', type=int, default=None,
+                  help='ID turnieju (domyslnie wszystkie ligi).')
+    def rebuild_standings_command(tournament_id):
+        """Przelicza tabele ligowe od zera na podstawie zakonczonych meczow."""
+        try:
+            rows = rebuild_standings(tournament_id)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Zapisano {rows} wierszy tabeli ligowej.")
+
+    # flask rebuild-search-index
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        """Uzupelnia znormalizowane nazwy (searchName) uzywane przez wyszukiwarke."""
+        updated = rebuild_search_names()
+        click.echo(f"Zaktualizowano {updated} wierszy.")
+
+    # flask check-query-plans - konczy sie bledem, gdy ktoras z goracych sciezek robi pelny skan tabeli
+    @app.cli.command('check-query-plans')
+    @click.option('--verbose', is_flag=True, help='Wypisz pelne plany zapytan.')
+    def check_query_plans_command(verbose):
+        """Sprawdza przez EXPLAIN, czy najczestsze zapytania korzystaja z indeksow."""
+        failed = []
+        for name, plan, uses_index in check_query_plans():
+            click.echo(f"{'OK  ' if uses_index else 'SCAN'} {name}")
+            if verbose or not uses_index:
+                for line in plan:
+                    click.echo(f"       {line}")
+            if not uses_index:
+                failed.append(name)
+        if failed:
+            raise click.ClickException(
+                f"Pełny skan tabeli w {len(failed)} zapytaniach: {', '.join(failed)}")
+
+    # flask verify-player-stats [--fix] - konczy sie bledem, gdy sa rozjazdy (chyba ze z --fix)
+    @app.cli.command('verify-player-stats')
+    @click.option('--fix', is_flag=True, help='Popraw rozjazdy na podstawie zdarzen meczowych.')
+    def verify_player_stats_command(fix):
+        """Przelicza gole i czerwone kartki zawodnikow w turniejach z MatchEvent i porownuje z tabela."""
+        drift = PlayerTournamentStats.verify(fix=fix)
+        for player_id, tournament_id, field, stored, actual in drift:
+            click.echo(f"zawodnik {player_id}, turniej {tournament_id}: {field} {stored} -> {actual}")
+        if not drift:
+            click.echo("Statystyki zawodników są zgodne ze zdarzeniami meczowymi.")
+        elif fix:
+            click.echo(f"Poprawiono {len(drift)} wartości.")
+        else:
+            raise click.ClickException(
+                f"Rozjazdy w {len(drift)} wartościach - uruchom z --fix, aby je poprawić.")
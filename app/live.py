@@ -0,0 +1,196 @@
+"""
+Wyniki na zywo (Server-Sent Events).
+
+Zapisy zdarzen meczowych i wynikow zglaszaja wiadomosci przez publish_after_commit();
+po udanym commicie trafiaja one do brokera na kanaly "match:<id>" i "tournament:<id>".
+Domyslny broker dziala w procesie (kazdy odbiorca ma ograniczona kolejke), alternatywnie
+LIVE_BACKEND='redis' uzywa pub/sub lokalnego serwera zgodnego z Redis - wtedy wiadomosci
+docieraja do odbiorcow we wszystkich procesach aplikacji.
+"""
+import json
+import queue
+import threading
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from . import db
+
+
+def sse_frame(type, data):
+    """Gotowa ramka SSE - formatowana raz przy publikacji, nie dla kazdego odbiorcy."""
+    return f"event: {type}\ndata: {json.dumps(data)}\n\n"
+
+
+# Wysylana odbiorcy, ktory nie nadazal i stracil czesc wiadomosci - powinien odswiezyc dane
+RESYNC = sse_frame("resync", {})
+
+
+class Subscription:
+    """Ograniczona kolejka wiadomosci jednego odbiorcy."""
+
+    def __init__(self, broker, channel, max_size):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(max_size)
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Wolny odbiorca nie moze blokowac zapisu wyniku - gubimy zalegle wiadomosci
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Nastepna wiadomosc albo None po uplywie timeout."""
+        if self.overflowed:
+            self.overflowed = False
+            self._drain()
+            return RESYNC
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def _drain(self):
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+class LocalBroker:
+    """Pub/sub w pamieci procesu."""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._channels.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._channels[subscription.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+
+class RedisSubscription:
+
+    def __init__(self, pubsub, channel):
+        self.pubsub = pubsub
+        self.pubsub.subscribe(channel)
+
+    def get(self, timeout=None):
+        message = self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        data = message['data']
+        return data.decode() if isinstance(data, bytes) else data
+
+    def close(self):
+        self.pubsub.close()
+
+
+class RedisBroker:
+    """
+    Pub/sub lokalnego serwera zgodnego z Redis (klient redis-py).
+    Bufor wolnych odbiorcow ogranicza sam serwer (client-output-buffer-limit pubsub).
+    """
+
+    def __init__(self, url='redis://127.0.0.1:6379/0', prefix='turniej:live:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("LIVE_BACKEND='redis' wymaga pakietu redis.")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def subscribe(self, channel):
+        return RedisSubscription(
+            self.client.pubsub(ignore_subscribe_messages=True), self.prefix + channel)
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, message)
+
+
+def init_live(app):
+    backend = app.config.get('LIVE_BACKEND', 'local')
+
+    if backend == 'local':
+        broker = LocalBroker(app.config.get('LIVE_QUEUE_SIZE', 100))
+    elif backend == 'redis':
+        broker = RedisBroker(app.config.get('LIVE_REDIS_URL', 'redis://127.0.0.1:6379/0'))
+    else:
+        raise ValueError(f"Nieznany backend wyników na żywo: {backend}")
+
+    app.extensions['live_broker'] = broker
+    return broker
+
+
+def get_broker():
+    return current_app.extensions['live_broker']
+
+
+def sse_stream(broker, channel, keepalive=15):
+    """
+    Generator strumienia text/event-stream. Nie korzysta z bazy ani kontekstu zapytania,
+    wiec otwarte polaczenie kosztuje tylko watek i kolejke, bez sesji SQLAlchemy.
+    """
+    subscription = broker.subscribe(channel)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            message = subscription.get(timeout=keepalive)
+            # Komentarz SSE podtrzymuje bezczynne polaczenie przez proxy
+            yield message if message is not None else ": keepalive\n\n"
+    finally:
+        subscription.close()
+
+
+# Publikowanie ---------------------------------------------------------------------------------------------------
+
+def publish_after_commit(match, type, **data):
+    """Zglasza wiadomosc o meczu - zostanie wyslana dopiero po udanym commicie."""
+    message = sse_frame(type, {"match_id": match.id, "tournament_id": match.tournament_id, **data})
+    channels = (f"match:{match.id}", f"tournament:{match.tournament_id}")
+    db.session.info.setdefault('live_messages', []).append((channels, message))
+
+
+def publish_score(match):
+    publish_after_commit(match, "score", scoreHome=match.scoreHome,
+                         scoreAway=match.scoreAway, status=match.status)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_after_commit(session):
+    messages = session.info.pop('live_messages', None)
+    if messages and has_app_context() and 'live_broker' in current_app.extensions:
+        broker = get_broker()
+        for channels, message in messages:
+            for channel in channels:
+                broker.publish(channel, message)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('live_messages', None)
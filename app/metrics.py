@@ -0,0 +1,213 @@
+"""
+Metryki zadan HTTP w formacie tekstowym Prometheusa, dostepne dla adminow pod /metrics.
+
+Per endpoint (views.*, auth.*, admin.*, api.*): histogramy czasu obslugi zadania,
+czasu bazy (z app/querylog.py) i rozmiaru odpowiedzi oraz licznik bledow wg kodu
+odpowiedzi. Osobno histogram czasu renderowania szablonow. Kazdy watek zapisuje do
+wlasnej kopii licznikow (bez blokady na sciezce zadania) - scalane sa dopiero przy
+odczycie /metrics. Narzut mierzy python -m benchmarks.metrics.
+"""
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from collections import deque
+
+from flask import Response, current_app, g, request, session
+from jinja2 import Template
+from flask_login import login_required
+
+# Gorne granice przedzialow histogramow
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# nazwa -> (typ, opis, przedzialy histogramu)
+METRICS = {
+    'turniej_http_request_duration_seconds': ('histogram', 'Czas obslugi zadania HTTP.', LATENCY_BUCKETS),
+    'turniej_http_request_db_seconds': ('histogram', 'Laczny czas zapytan SQL w zadaniu HTTP.', LATENCY_BUCKETS),
+    'turniej_http_response_size_bytes': ('histogram', 'Rozmiar tresci odpowiedzi HTTP.', SIZE_BUCKETS),
+    'turniej_template_render_seconds': ('histogram', 'Czas renderowania szablonu.', LATENCY_BUCKETS),
+    'turniej_http_errors_total': ('counter', 'Odpowiedzi HTTP z kodem 4xx/5xx.', None),
+}
+
+
+class _Holder:
+    """Kopia licznikow watku w threading.local - znika razem z watkiem."""
+
+    __slots__ = ('shard', '__weakref__')
+
+    def __init__(self, shard):
+        self.shard = shard
+
+
+def _merge(into, shard):
+    for key, value in list(shard.items()):
+        if isinstance(value, list):
+            total = into.setdefault(key, [0] * len(value))
+            for i, v in enumerate(value):
+                total[i] += v
+        else:
+            into[key] = into.get(key, 0) + value
+
+
+class MetricsRegistry:
+    """
+    Histogramy i liczniki z etykietami. Wartosci sa kluczowane krotka (nazwa, etykiety),
+    etykiety to krotka par (nazwa, wartosc). Histogram to lista: liczniki przedzialow
+    (ostatni to +Inf) i suma obserwacji na koncu.
+
+    Liczniki zakonczonych watkow (flask run to watek na zadanie) sa dolaczane do wspolnej
+    bazy, wiec liczba kopii nie rosnie z liczba obsluzonych zadan.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._shards = {}
+        self._base = {}
+        # Kopie zakonczonych watkow czekajace na dolaczenie do bazy. Finalizator tylko
+        # dopisuje (bez blokady) - moze go wywolac GC w dowolnym miejscu, takze pod self._lock.
+        self._retired = deque()
+
+    def _shard(self):
+        try:
+            return self._local.holder.shard
+        except AttributeError:
+            shard = {}
+            holder = self._local.holder = _Holder(shard)
+            weakref.finalize(holder, self._retired.append, shard)
+            with self._lock:
+                self._fold_retired()
+                self._shards[id(shard)] = shard
+            return shard
+
+    def _fold_retired(self):
+        """Dolacza kopie zakonczonych watkow do bazy (wywolywane pod self._lock)."""
+        while self._retired:
+            shard = self._retired.popleft()
+            _merge(self._base, shard)
+            self._shards.pop(id(shard), None)
+
+    def observe(self, name, labels, value):
+        shard = self._shard()
+        key = (name, labels)
+        histogram = shard.get(key)
+        if histogram is None:
+            histogram = shard[key] = [0] * (len(METRICS[name][2]) + 1) + [0.0]
+        histogram[bisect_left(METRICS[name][2], value)] += 1
+        histogram[-1] += value
+
+    def inc(self, name, labels, amount=1):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def collect(self):
+        """Suma wartosci ze wszystkich watkow: {(nazwa, etykiety): wartosc}."""
+        merged = {}
+        with self._lock:
+            self._fold_retired()
+            _merge(merged, self._base)
+            for shard in list(self._shards.values()):
+                _merge(merged, shard)
+        return merged
+
+    def render(self):
+        """Format tekstowy Prometheusa (text/plain; version=0.0.4)."""
+        by_name = {}
+        for (name, labels), value in self.collect().items():
+            by_name.setdefault(name, []).append((labels, value))
+
+        lines = []
+        for name, (kind, help, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in sorted(by_name.get(name, ())):
+                if kind == 'counter':
+                    lines.append(f"{name}{_labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip([*map(repr, buckets), '+Inf'], value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {value[-1]}")
+                lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class TimedTemplate(Template):
+    """
+    Szablon mierzacy czas render() - tak render_template renderuje cala strone (include i makra
+    ida w tym samym wywolaniu). Tanszy niz para sygnalow before_render_template/template_rendered.
+    """
+
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        result = super().render(*args, **kwargs)
+        self.environment.app.extensions['metrics'].observe(
+            'turniej_template_render_seconds', (('template', self.name or ''),), time.perf_counter() - start)
+        return result
+
+
+@login_required
+def metrics_view():
+    if not session.get('is_admin'):
+        return Response('Brak uprawnień.\n', status=403, mimetype='text/plain')
+    return Response(current_app.extensions['metrics'].render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    registry = MetricsRegistry()
+    app.extensions['metrics'] = registry
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
+    if not app.config.get('METRICS_ENABLED', True):
+        return registry
+
+    # Haki sa na sciezce kazdego zadania: proxy Flaska (g, request) rozwiazywane raz,
+    # etykiety endpointu liczone raz na (endpoint, metoda)
+    labels_cache = {}
+    observe, inc = registry.observe, registry.inc
+
+    def start_request():
+        g.metrics_start = time.perf_counter()
+
+    def finish_request(response):
+        end = time.perf_counter()
+        ctx_g = g._get_current_object()
+        start = getattr(ctx_g, 'metrics_start', None)
+        if start is None:
+            return response
+        req = request._get_current_object()
+        key = (req.endpoint, req.method)
+        labels = labels_cache.get(key)
+        if labels is None:
+            base = (('blueprint', req.blueprint or ''), ('endpoint', req.endpoint or ''))
+            labels = labels_cache[key] = (base, base + (('method', req.method),))
+        base, with_method = labels
+
+        observe('turniej_http_request_duration_seconds', with_method, end - start)
+        stats = getattr(ctx_g, 'query_stats', None)
+        if stats is not None:
+            observe('turniej_http_request_db_seconds', base, stats.total)
+        # Odpowiedzi strumieniowe (SSE, pliki) nie maja znanej dlugosci
+        size = response.content_length
+        if size is not None:
+            observe('turniej_http_response_size_bytes', base, size)
+        if response.status_code >= 400:
+            inc('turniej_http_errors_total', base + (('status', str(response.status_code)),))
+        return response
+
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.jinja_env.template_class = TimedTemplate
+    return registry
@@ -1,29 +1,238 @@
 from . import db
+from .cache import mark_stale
+from .live import publish_score
+from .services.text import normalize_name
 from flask_login import UserMixin
+from flask import current_app
+from sqlalchemy import DDL, bindparam, case, event, func, insert, inspect, literal, select, tuple_, update
 from sqlalchemy.exc import IntegrityError
-from itertools import permutations
-from random import shuffle
+from sqlalchemy.orm import Session, joinedload
+from random import Random, SystemRandom
+
+
+def _get_sorted(cls, n=None, sort_by="id", after=None, before=None, where=()):
+    """
+    Zwraca wiersze posortowane po (sort_by, id), opcjonalnie zawezone warunkami `where`.
+    after/before to klucz (wartosc, id) ostatniego/pierwszego wiersza sasiedniej strony -
+    paginacja po kluczu zamiast OFFSET, wiec kazda strona to ten sam odczyt z indeksu.
+    """
+    column = getattr(cls, sort_by)
+    key = tuple_(column, cls.id)
+    query = cls.query.filter(*where)
+
+    if after is not None:
+        query = query.filter(key > tuple(after))
+    elif before is not None:
+        query = query.filter(key < tuple(before))
+
+    if before is not None and after is None:
+        query = query.order_by(column.desc(), cls.id.desc())
+    else:
+        query = query.order_by(column.asc(), cls.id.asc())
+
+    if n:
+        query = query.limit(n)
+    items = query.all()
+
+    # Strona "wstecz" czytana jest od konca - odwracamy do normalnej kolejnosci
+    if before is not None and after is None:
+        items.reverse()
+    return items
+
+
+def _tags(prefix, obj, *attrs):
+    """
+    Tagi cache dla wartosci kluczy obcych obiektu - aktualnych i sprzed zmiany,
+    zeby przeniesienie (np. zawodnika do innej druzyny) uniewaznilo obie strony.
+    """
+    tags = set()
+    state = inspect(obj)
+    for attr in attrs:
+        history = state.attrs[attr].history
+        for value in (*history.added, *history.unchanged, *history.deleted):
+            if value is not None:
+                tags.add(f"{prefix}:{value}")
+    return tags
+
+
+def iter_round_robin(team_ids, legs=2):
+    """
+    Terminarz "kazdy z kazdym" metoda kolowa: pierwsza druzyna stoi w miejscu, reszta
+    obraca sie o jedno miejsce co kolejke. Oddaje trojki (kolejka, gospodarz, gosc).
+    Gospodarz zmienia sie naprzemiennie, wiec kazda druzyna gra u siebie co druga kolejke
+    (roznica mecz u siebie / na wyjezdzie to najwyzej 1). Przy legs=2 druga runda
+    to lustrzane odbicie pierwszej z zamienionymi gospodarzami.
+    Przy nieparzystej liczbie druzyn kazda kolejke jedna z nich pauzuje.
+    """
+    slots = list(team_ids)
+    if len(slots) % 2:
+        slots.insert(0, None)  # pauza - na stalej pozycji
+    n = len(slots)
+    rounds = n - 1
+
+    for leg in range(legs):
+        rotation = list(slots)
+        for r in range(rounds):
+            for i in range(n // 2):
+                home, away = rotation[i], rotation[n - 1 - i]
+                if home is None or away is None:
+                    continue
+                # Druzyna stala zmienia gospodarza co kolejke, pozostale pary wg pozycji
+                if (i == 0 and r % 2) or (i > 0 and i % 2):
+                    home, away = away, home
+                if leg % 2:
+                    home, away = away, home
+                yield leg * rounds + r + 1, home, away
+            rotation.insert(1, rotation.pop())
+
+
+def bracket_order(size):
+    """
+    Numery rozstawienia w kolejnosci miejsc pierwszej rundy drabinki o rozmiarze size
+    (potega 2), np. 8 -> [1, 8, 4, 5, 2, 7, 3, 6]. Najwyzej rozstawieni moga sie
+    spotkac dopiero w finale, a kazda para sumuje sie do size + 1.
+    """
+    order = [1]
+    while len(order) < size:
+        total = 2 * len(order) + 1
+        order = [seed for position in order for seed in (position, total - position)]
+    return order
+
+
+def _draw_order(team_ids, ranked_ids, seed):
+    """Kolejnosc losowania: najpierw rozstawieni z ranked_ids, potem reszta wylosowana z ziarnem seed."""
+    members = set(team_ids)
+    seeded = [team_id for team_id in dict.fromkeys(ranked_ids) if team_id in members]
+    rest = sorted(members.difference(seeded))
+    Random(seed).shuffle(rest)
+    return seeded + rest
+
+
+def group_draw(team_ids, groups, ranked_ids=(), seed=0):
+    """
+    Podzial druzyn na grupy "wezykiem": kolejne koszyki po `groups` druzyn (w kolejnosci
+    rozstawienia jak w playoff_draw) trafiaja do grup na przemian od pierwszej i od ostatniej.
+    Zwraca liste grup (list id druzyn).
+    """
+    team_ids = list(team_ids)
+    if groups < 1 or len(team_ids) < 2 * groups:
+        raise ValueError("Każda grupa musi mieć co najmniej dwie drużyny.")
+
+    result = [[] for _ in range(groups)]
+    for i, team_id in enumerate(_draw_order(team_ids, ranked_ids, seed)):
+        pot, place = divmod(i, groups)
+        result[place if pot % 2 == 0 else groups - 1 - place].append(team_id)
+    return result
+
+
+def playoff_draw(team_ids, ranked_ids=(), seed=0):
+    """
+    Losowanie pierwszej rundy play-off dla dowolnej liczby druzyn (co najmniej 2).
+    Druzyny z ranked_ids (np. kolejnosc tabeli ligowej) sa rozstawione w tej kolejnosci,
+    pozostale losowane generatorem z ziarnem seed - ten sam seed daje to samo losowanie.
+    Drabinka jest dopelniana do potegi 2 wolnymi losami (None) dla najwyzej rozstawionych.
+    Zwraca liste par (gospodarz, gosc).
+    """
+    team_ids = list(team_ids)
+    if len(team_ids) < 2:
+        raise ValueError("Turniej play-off wymaga co najmniej dwóch drużyn.")
+
+    size = 1 << (len(team_ids) - 1).bit_length()
+    seeds = _draw_order(team_ids, ranked_ids, seed) + [None] * (size - len(team_ids))
+    positions = bracket_order(size)
+    return [(seeds[positions[i] - 1], seeds[positions[i + 1] - 1]) for i in range(0, size, 2)]
+
+
+def _separate_groups(pairs, group_of):
+    """
+    Zamienia gosci miedzy parami pierwszej rundy tak, zeby (o ile sie da)
+    druzyny z tej samej grupy nie spotkaly sie od razu ponownie.
+    """
+    def clash(home_id, away_id):
+        return home_id is not None and away_id is not None and group_of.get(home_id) == group_of.get(away_id)
+
+    pairs = [list(pair) for pair in pairs]
+    for i, (home_id, away_id) in enumerate(pairs):
+        if not clash(home_id, away_id):
+            continue
+        for other in pairs[:i] + pairs[i + 1:]:
+            if other[1] is not None and not clash(home_id, other[1]) and not clash(other[0], away_id):
+                pairs[i][1], other[1] = other[1], away_id
+                break
+    return [tuple(pair) for pair in pairs]
+
+
+def insert_fixtures(tournament_id, fixtures, batch_size=None, group_number=0):
+    """
+    Wstawia mecze z generatora (runda, gospodarz, gosc) paczkami po batch_size wierszy
+    przez Core insert (executemany) - bez tworzenia obiektow Match. Bez commita.
+    """
+    batch_size = batch_size or current_app.config.get('FIXTURE_BATCH_SIZE', 1000)
+    statement = insert(Match.__table__)
+    batch = []
+    inserted = 0
+    mark_stale(f"tournament:{tournament_id}")
+    for round, home_id, away_id in fixtures:
+        batch.append({
+            'homeTeam_id': home_id,
+            'awayTeam_id': away_id,
+            'tournament_id': tournament_id,
+            'status': 'planned',
+            'scoreHome': None,
+            'scoreAway': None,
+            'round': round,
+            'groupNumber': group_number,
+        })
+        if len(batch) >= batch_size:
+            mark_stale(*(f"team:{row[key]}" for row in batch for key in ('homeTeam_id', 'awayTeam_id')))
+            db.session.execute(statement, batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        mark_stale(*(f"team:{row[key]}" for row in batch for key in ('homeTeam_id', 'awayTeam_id')))
+        db.session.execute(statement, batch)
+        inserted += len(batch)
+    return inserted
 
 
 class Tournament(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(102), unique=True, nullable=False)
-    type = db.Column(db.Enum('league', 'playoff',
-                     name='tournament_type_enum'), nullable=False)
+    # create_constraint: poza PostgreSQL (SQLite w profilach testing/bench) typ wyliczeniowy
+    # emulowany jest przez CHECK, wiec baza odrzuca te same wartosci
+    type = db.Column(db.Enum('league', 'playoff', 'groups_playoff',
+                     name='tournament_type_enum', create_constraint=True), nullable=False)
     status = db.Column(db.Enum('active', 'ended', 'canceled', 'planned',
-                       name='tournament_status_enum'), nullable=False)
+                       name='tournament_status_enum', create_constraint=True), nullable=False)
 
     round = db.Column(db.Integer)
+    # Play-off: ziarno losowania (zapisane, zeby losowanie dalo sie powtorzyc i sprawdzic)
+    # i opcjonalna liga, ktorej tabela wyznacza rozstawienie
+    drawSeed = db.Column(db.BigInteger)
+    seedingTournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'))
+    # Liga i grupy: 1 - kazdy z kazdym raz, 2 - mecz i rewanz
+    legs = db.Column(db.Integer, nullable=False, default=2, server_default='2')
+    # Grupy + play-off: liczba grup i liczba druzyn awansujacych z kazdej grupy
+    groups = db.Column(db.Integer)
+    advancing = db.Column(db.Integer)
+    # Wersja danych strony turnieju - rosnie przy kazdym commicie, ktory ja zmienia (ETag)
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     teams = db.relationship('Team', back_populates='tournament')
     matches = db.relationship(
         'Match', back_populates='tournament', cascade="all, delete-orphan")
+    standings = db.relationship(
+        'Standing', back_populates='tournament', cascade="all, delete-orphan")
+    bracketSlots = db.relationship(
+        'BracketSlot', back_populates='tournament', cascade="all, delete-orphan")
+    playerStats = db.relationship(
+        'PlayerTournamentStats', back_populates='tournament', cascade="all, delete-orphan")
+
+    def cache_tags(self):
+        return {f"tournament:{self.id}"}
 
     @classmethod
-    def get_tournaments(cls, n=None, sort_by="name"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_tournaments(cls, n=None, sort_by="name", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
     @classmethod
     def find_tournament(cls, name):
@@ -54,6 +263,11 @@ class Tournament(db.Model):
         if not teams:
             raise ValueError(f"Brak druzyn")
 
+        # Grupy + play-off: rozmiar grup sprawdzony przed zapisem, zeby generate_matches
+        # nie odrzucil turnieju z juz przypisanymi druzynami
+        if tournament.type == 'groups_playoff':
+            cls._check_group_sizes(tournament, len(tournament.teams) + len(teams))
+
         for team in teams:
             if team in tournament.teams:
                 raise ValueError(
@@ -63,6 +277,15 @@ class Tournament(db.Model):
 
         db.session.commit()
 
+    @classmethod
+    def _check_group_sizes(cls, tournament, team_count):
+        # Losowanie wezykiem - najmniejsza grupa ma team_count // groups druzyn
+        smallest = team_count // (tournament.groups or 1)
+        if smallest < 2:
+            raise ValueError("W każdej grupie muszą grać co najmniej dwie drużyny.")
+        if smallest < (tournament.advancing or 1):
+            raise ValueError("Z grupy nie może awansować więcej drużyn, niż w niej gra.")
+
     @classmethod
     def get_teams(cls, id):
         tournament = cls.query.get(id)  # Pobierz turniej po ID
@@ -117,14 +340,12 @@ class Tournament(db.Model):
             raise ValueError(
                 "Nie można zakończyć turnieju, ponieważ istnieją niezakończone mecze.")
 
-        # Dodatkowe zabezpieczenie dla turnieju typu 'playoff'
-        if tournament.type == 'playoff':
-            last_round = tournament.round
-            ended_matches = Match.query.filter_by(
-                tournament_id=tournament.id, round=last_round, status='ended').count()
-            if ended_matches != 1:
+        # Dodatkowe zabezpieczenie dla turnieju z drabinka - final musi byc rozegrany
+        if tournament.type in ('playoff', 'groups_playoff'):
+            final = BracketSlot.get_final(tournament.id)
+            if not final or not final.match or final.match.status != 'ended':
                 raise ValueError(
-                    "Nie można zakończyć turnieju typu 'playoff', ponieważ ostatnia runda nie została poprawnie zakończona (dokładnie jeden mecz musi być zakończony).")
+                    "Nie można zakończyć turnieju typu 'playoff', ponieważ finał nie został rozegrany.")
 
         tournament.status = 'ended'
         db.session.commit()
@@ -152,112 +373,101 @@ class Tournament(db.Model):
         for team in tournament.teams:
             team.tournament_id = None
 
-        for match in tournament.matches:
-            db.session.delete(match)
-
+        # Mecze, tabela i drabinka usuwane kaskadowo razem z turniejem (w jednym flushu,
+        # miejsca drabinki przed meczami, do ktorych sie odwoluja)
         db.session.delete(tournament)
         db.session.commit()
 
     @classmethod
     def generate_matches(cls, tournament):
-        matches = []
-        teams = Tournament.get_teams(tournament.id)
+        """
+        Generuje terminarz turnieju. Mecze nie sa trzymane w pamieci jako obiekty ORM -
+        generator oddaje kolejne pary, ktore trafiaja do bazy paczkami (executemany).
+        """
+        team_ids = [team_id for (team_id,) in db.session.query(Team.id).filter(
+            Team.tournament_id == tournament.id).order_by(Team.id)]
+
         if tournament.type == 'league':
-            for home_team, away_team in permutations(teams, 2):
-                # Mecz 1: Gospodarzem jest home_team
-                match1 = Match(
-                    homeTeam_id=home_team.id,
-                    awayTeam_id=away_team.id,
-                    tournament_id=tournament.id,
-                    status='planned',
-                    scoreHome=None,
-                    scoreAway=None,
-                    round=None
-                )
-                matches.append(match1)
-        elif tournament.type == 'playoff':  # 1 runda
-            shuffle(teams)
-            # Generowanie meczów pierwszej rundy
-            for i in range(0, len(teams), 2):
-                home_team = teams[i]
-                away_team = teams[i + 1]
-                match = Match(
-                    homeTeam_id=home_team.id,
-                    awayTeam_id=away_team.id,
-                    tournament_id=tournament.id,
-                    status='planned',
-                    scoreHome=None,
-                    scoreAway=None,
-                    round=1
-                )
-                matches.append(match)
-
-        db.session.add_all(matches)
+            insert_fixtures(tournament.id, iter_round_robin(team_ids, tournament.legs or 2))
+            # Pusta tabela ligowa - kazda druzyna startuje z zerowym dorobkiem
+            db.session.add_all(Standing.empty(tournament.id, team_id) for team_id in team_ids)
+        elif tournament.type == 'playoff':
+            # Cala drabinka od razu; mecze kolejnych rund powstaja przy konczeniu meczow
+            BracketSlot.create(tournament.id, playoff_draw(
+                team_ids, cls._seeding(tournament), cls._draw_seed(tournament)))
+        elif tournament.type == 'groups_playoff':
+            # Faza grupowa - w kazdej grupie terminarz ligowy i wlasna tabela;
+            # drabinka powstaje po zakonczeniu ostatniego meczu grupowego (start_knockout)
+            groups = group_draw(team_ids, tournament.groups or 1,
+                                cls._seeding(tournament), cls._draw_seed(tournament))
+            if min(len(group_ids) for group_ids in groups) < 2:
+                raise ValueError("W każdej grupie muszą grać co najmniej dwie drużyny.")
+            if min(len(group_ids) for group_ids in groups) < (tournament.advancing or 1):
+                raise ValueError("Z grupy nie może awansować więcej drużyn, niż w niej gra.")
+            for number, group_ids in enumerate(groups, start=1):
+                insert_fixtures(tournament.id, iter_round_robin(group_ids, tournament.legs or 2),
+                                group_number=number)
+                db.session.add_all(Standing.empty(tournament.id, team_id, number) for team_id in group_ids)
+
         db.session.commit()
 
     @classmethod
-    def generate_next_round(cls, tournament):
-        current_round = tournament.round
-
-        # Pobranie wszystkich meczów z aktualnej rundy
-        matches_in_round = Match.query.filter_by(
-            tournament_id=tournament.id,
-            round=current_round
-        ).all()
-
-        # Sprawdzenie, czy wszystkie mecze w rundzie są zakończone
-        if any(match.status != 'ended' for match in matches_in_round):
-            raise ValueError(
-                "Nie można wygenerować kolejnej rundy, dopóki wszystkie mecze obecnej rundy nie zostaną zakończone.")
-
-        # Pobranie zwycięzców z zakończonych meczów
-        winners = []
-        for match in matches_in_round:
-            if match.scoreHome > match.scoreAway:
-                winners.append(match.home_team)
-            elif match.scoreAway > match.scoreHome:
-                winners.append(match.away_team)
-            else:
-                raise ValueError(
-                    "Mecz zakończył się remisem, co nie jest dozwolone w turnieju play-off.")
+    def _draw_seed(cls, tournament):
+        # Ziarno zapisywane w turnieju - losowanie mozna powtorzyc i sprawdzic
+        if tournament.drawSeed is None:
+            tournament.drawSeed = SystemRandom().getrandbits(32)
+        return tournament.drawSeed
 
-        if len(winners) < 2:
-            raise ValueError(
-                "Pozostał tylko jeden zwycięzca! Ostatnia runda juz się odbyla!")
-        # Sprawdzenie, czy liczba zwycięzców jest parzysta
-        if len(winners) % 2 != 0:
-            raise ValueError(
-                "Nieparzysta liczba zwycięzców - coś poszło nie tak.")
-
-        # Generowanie nowych meczów na podstawie zwycięzców
-        next_round = current_round + 1
-        new_matches = []
-        for i in range(0, len(winners), 2):
-            match = Match(
-                homeTeam_id=winners[i].id,
-                awayTeam_id=winners[i + 1].id,
-                tournament_id=tournament.id,
-                status='planned',
-                scoreHome=None,
-                scoreAway=None,
-                round=next_round
-            )
-            new_matches.append(match)
-
-        # Dodanie nowych meczów do bazy danych
-        db.session.add_all(new_matches)
+    @classmethod
+    def _seeding(cls, tournament):
+        """Kolejnosc rozstawienia z tabeli ligi wskazanej w turnieju (albo brak rozstawienia)."""
+        if not tournament.seedingTournament_id:
+            return ()
+        from .services.tournament import calculate_ranking
+        return [team.id for team in calculate_ranking(tournament.seedingTournament_id)]
 
-        # Aktualizacja rundy w turnieju
-        tournament.round = next_round
-        db.session.commit()
+    @classmethod
+    def start_knockout(cls, tournament):
+        """
+        Grupy + play-off: po zakonczeniu wszystkich meczow grupowych tworzy drabinke
+        z druzyn awansujacych. Zwyciezcy grup sa rozstawieni przed wicemistrzami itd.,
+        a w kazdym koszyku decyduje bilans z grupy. Bez commita.
+        """
+        if tournament.type != 'groups_playoff':
+            return False
+
+        remaining = Match.query.filter(
+            Match.tournament_id == tournament.id, Match.groupNumber > 0, Match.status != 'ended').count()
+        if remaining or BracketSlot.query.filter_by(tournament_id=tournament.id).first():
+            return False
+
+        from .services.ranking import rank_tables
+        advancing = tournament.advancing or 1
+        pots = [[] for _ in range(advancing)]
+        group_of = {}
+        for number, rows in rank_tables(tournament).items():
+            for place, row in enumerate(rows[:advancing]):
+                pots[place].append(row)
+                group_of[row.team_id] = number
+
+        ranked_ids = [row.team_id for pot in pots for row in sorted(
+            pot, key=lambda row: (-row.points, row.goalsAgainst - row.goalsFor, -row.goalsFor, row.team_id))]
+        pairs = _separate_groups(playoff_draw(ranked_ids, ranked_ids), group_of)
+        BracketSlot.create(tournament.id, pairs)
+        tournament.round = 1
+        return True
 
 
 class Team(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
+    # Znormalizowana nazwa (bez akcentow, male litery) - pod wyszukiwarke
+    searchName = db.Column(db.String(100))
 
     tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'))
     tournament = db.relationship('Tournament', back_populates='teams')
+    # Wersja danych strony druzyny (sklad, trener, mecze) - ETag
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
     players = db.relationship('Player', back_populates='team')
 
     teamCoach = db.relationship('Coach', back_populates='team')
@@ -268,12 +478,19 @@ class Team(db.Model):
     away_matches = db.relationship(
         "Match", foreign_keys="Match.awayTeam_id", back_populates="away_team")
 
+    __table_args__ = (
+        db.Index('ix_team_searchName_trgm', 'searchName', postgresql_using='gin',
+                 postgresql_ops={'searchName': 'gin_trgm_ops'}),
+    )
+
+    _search_fields = ('name',)
+
+    def cache_tags(self):
+        return {f"team:{self.id}"} | _tags("tournament", self, 'tournament_id')
+
     @classmethod
-    def get_teams(cls, n=None, sort_by="name"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_teams(cls, n=None, sort_by="name", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
     @classmethod
     def get_teams_without_tournament(cls):
@@ -377,22 +594,36 @@ class Player(db.Model):
     lastName = db.Column(db.String(50), nullable=False)
     age = db.Column(db.Integer, nullable=False)
     position = db.Column(db.Enum('substitute', 'field',
-                         name='player_position_enum'))
+                         name='player_position_enum', create_constraint=True))
     status = db.Column(db.Enum('active', 'suspended',
-                       name='player_status_enum'), nullable=False)
+                       name='player_status_enum', create_constraint=True), nullable=False)
     goals = db.Column(db.Integer, default=0)
     appearances = db.Column(db.Integer, default=0)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'))
+    # "imie nazwisko" bez akcentow i malymi literami - pod wyszukiwarke
+    searchName = db.Column(db.String(102))
 
     team = db.relationship('Team', back_populates='players')
     playerEvents = db.relationship('MatchEvent', back_populates='player')
+    tournamentStats = db.relationship(
+        'PlayerTournamentStats', back_populates='player', cascade="all, delete-orphan")
+
+    __table_args__ = (
+        db.Index('ix_player_lastName_id', 'lastName', 'id'),
+        # Globalny ranking strzelcow
+        db.Index('ix_player_goals_id', goals.desc(), id),
+        db.Index('ix_player_searchName_trgm', 'searchName', postgresql_using='gin',
+                 postgresql_ops={'searchName': 'gin_trgm_ops'}),
+    )
+
+    _search_fields = ('firstName', 'lastName')
+
+    def cache_tags(self):
+        return {f"player:{self.id}"} | _tags("team", self, 'team_id')
 
     @classmethod
-    def get_players(cls, n=None, sort_by="lastName"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_players(cls, n=None, sort_by="lastName", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
     @classmethod
     def get_players_without_team(cls):
@@ -417,6 +648,34 @@ class Player(db.Model):
 
         return players
 
+    @classmethod
+    def record_appearances(cls, team_ids, times=1, tournament_id=None):
+        """
+        Zawodnicy z pola podanych drużyn dostają +times występów (także w statystykach
+        turnieju tournament_id), a zawieszeni wracają do gry (zawieszenie odbyte w tym meczu).
+        Zapytania set-based, bez ładowania składów do sesji i bez commita - zmiany idą
+        razem z transakcją wywołującego.
+        """
+        team_ids = list(team_ids)
+        if not team_ids:
+            return
+
+        # UPDATE omija sesje ORM - strony druzyn i ich zawodnikow trzeba uniewaznic recznie
+        mark_stale(*(f"team:{id}" for id in team_ids), *(f"roster:{id}" for id in team_ids))
+
+        db.session.execute(
+            update(cls)
+            .where(cls.team_id.in_(team_ids), cls.position == 'field')
+            .values(appearances=func.coalesce(cls.appearances, 0) + times),
+            execution_options={'synchronize_session': False})
+        if tournament_id is not None:
+            PlayerTournamentStats.record_appearances(tournament_id, team_ids, times)
+        db.session.execute(
+            update(cls)
+            .where(cls.team_id.in_(team_ids), cls.status == 'suspended')
+            .values(status='active'),
+            execution_options={'synchronize_session': False})
+
     # Znajduje zawodnika po ID
     @classmethod
     def find_player_by_id(cls, id):
@@ -453,8 +712,12 @@ class Match(db.Model):
     scoreHome = db.Column(db.Integer)
     scoreAway = db.Column(db.Integer)
     status = db.Column(
-        db.Enum('planned', 'ended', name='match_status_enum'), nullable=False)
+        db.Enum('planned', 'ended', name='match_status_enum', create_constraint=True), nullable=False)
     round = db.Column(db.Integer)
+    # Numer grupy w fazie grupowej (0 - mecz ligowy albo drabinki)
+    groupNumber = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Wersja danych strony meczu (wynik, zdarzenia) - ETag
+    revision = db.Column(db.Integer, nullable=False, default=1, server_default='1')
 
     homeTeam_id = db.Column(
         db.Integer, db.ForeignKey('team.id'), nullable=False)
@@ -476,14 +739,48 @@ class Match(db.Model):
 
     matchEvents = db.relationship('MatchEvent', back_populates='match')
 
+    __table_args__ = (
+        # find_match / add_match - jeden mecz danej pary w turnieju (osobno w grupie i w drabince,
+        # bo druzyny z jednej grupy moga sie spotkac ponownie w fazie pucharowej);
+        # indeks sluzy tez team.home_matches
+        db.UniqueConstraint('homeTeam_id', 'awayTeam_id', 'tournament_id', 'groupNumber',
+                            name='uq_match_fixture'),
+        db.Index('ix_match_awayTeam_id', 'awayTeam_id'),
+        # Tournament.finish (liczenie po statusie) i kolejka/runda turnieju (Match.get_round)
+        db.Index('ix_match_tournament_status', 'tournament_id', 'status'),
+        db.Index('ix_match_tournament_round_status', 'tournament_id', 'round', 'status'),
+        # referee_details
+        db.Index('ix_match_referee_id', 'referee_id'),
+    )
+
+
+
+    @property
+    def is_knockout(self):
+        """Mecz drabinki - remis niedozwolony, zwyciezca awansuje."""
+        return self.tournament.type == 'playoff' or (
+            self.tournament.type == 'groups_playoff' and not self.groupNumber)
+
+    def cache_tags(self):
+        return ({f"match:{self.id}"}
+                | _tags("team", self, 'homeTeam_id', 'awayTeam_id')
+                | _tags("tournament", self, 'tournament_id')
+                | _tags("referee", self, 'referee_id'))
 
+    @classmethod
+    def get_matches(cls, n=None, sort_by="id", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
     @classmethod
-    def get_matches(cls, n=None, sort_by="id"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_tournament_matches(cls, tournament_id, round=None, group_stage=False,
+                               n=None, sort_by="id", after=None, before=None):
+        """Mecze turnieju (albo jednej kolejki - jak get_round) stronami jak get_matches."""
+        where = [cls.tournament_id == tournament_id]
+        if round is not None:
+            where.append(cls.round == round)
+        if group_stage:
+            where.append(cls.groupNumber > 0)
+        return _get_sorted(cls, n, sort_by, after, before, where)
 
     # TO DO metody takie jak przy torunamencie itp.
 
@@ -512,6 +809,21 @@ class Match(db.Model):
 
         return match
 
+    @classmethod
+    def get_round(cls, tournament_id, round, group_stage=False):
+        """
+        Mecze jednej kolejki/rundy turnieju razem z druzynami. W turnieju grupy + play-off
+        rundy drabinki maja te same numery co kolejki grup - group_stage zostawia tylko mecze grupowe.
+        """
+        query = cls.query.options(
+            joinedload(cls.home_team), joinedload(cls.away_team)
+        ).filter(
+            cls.tournament_id == tournament_id, cls.round == round
+        )
+        if group_stage:
+            query = query.filter(cls.groupNumber > 0)
+        return query.order_by(cls.id.asc()).all()
+
     @classmethod
     def find_match_by_id(cls, id):
         m = cls.query.get(id)
@@ -558,31 +870,46 @@ class Match(db.Model):
 
     @classmethod
     def finish_match(cls, match, scoreHome, scoreAway):
-        homeTeam = match.home_team
-        awayTeam = match.away_team
-
         if match.status == 'ended':
             raise ValueError("Mecz już został zakończony.")
-        
+
+        # Formularz przekazuje napisy - do bazy i do wiadomosci na zywo trafiaja liczby
+        try:
+            scoreHome, scoreAway = int(scoreHome), int(scoreAway)
+        except (TypeError, ValueError):
+            raise ValueError("Wynik meczu musi być liczbą całkowitą.")
+        # Jak w finish_matchday - remisu meczu drabinki nie daloby sie pozniej zamknac
+        if match.is_knockout and scoreHome == scoreAway:
+            raise ValueError("Remis nie jest dozwolony w turnieju play-off.")
+
         match.scoreHome = scoreHome
         match.scoreAway = scoreAway
-        players_home = homeTeam.players
-        players_away = awayTeam.players
-        
-        
-        for player in players_home:
-            if player.position =="field":
-                player.appearances+=1
-            if player.status == "suspended":
-                player.status == "active"
-        for player in players_away:
-            if player.position == "field":
-                player.appearances+=1 
-            if player.status == "suspended":
-                player.status == "active"
+        publish_score(match)
+
+        # Występy i koniec zawieszeń dla obu składów - dwa UPDATE zamiast pętli po zawodnikach
+        Player.record_appearances([match.homeTeam_id, match.awayTeam_id], tournament_id=match.tournament_id)
+
         # Zapis zmian w bazie danych
         db.session.commit()
 
+    @classmethod
+    def end_match(cls, match):
+        """
+        Oznacza mecz jako zakończony, aktualizuje tabelę ligową albo drabinkę play-off.
+        Nie robi commita - zmiany trafiają do bazy razem z transakcją wywołującego.
+        """
+        if match.status == 'ended':
+            raise ValueError("Mecz już został zakończony.")
+
+        match.status = 'ended'
+        Standing.record_match(match)
+        # Play-off: zwyciezca od razu trafia do nastepnej rundy drabinki
+        BracketSlot.advance(match)
+        # Grupy + play-off: ostatni mecz grupowy tworzy drabinke
+        if match.groupNumber:
+            Tournament.start_knockout(match.tournament)
+        publish_score(match)
+
     @classmethod
     def cancel_match(cls, home_team_name, away_team_name, tournament_name):
         match = cls.find_match(home_team_name, away_team_name, tournament_name)
@@ -606,7 +933,7 @@ class Match(db.Model):
 class MatchEvent(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     eventType = db.Column(
-        db.Enum('goal', 'redCard', name='matchEvent_type_enum'), nullable=False)
+        db.Enum('goal', 'redCard', name='matchEvent_type_enum', create_constraint=True), nullable=False)
     match_id = db.Column(db.Integer, db.ForeignKey('match.id'), nullable=False)
     player_id = db.Column(db.Integer, db.ForeignKey(
         'player.id'), nullable=False)
@@ -614,12 +941,18 @@ class MatchEvent(db.Model):
     match = db.relationship('Match', back_populates='matchEvents')
     player = db.relationship('Player', back_populates='playerEvents')
 
+    __table_args__ = (
+        # match_details i player_details
+        db.Index('ix_match_event_match_id', 'match_id', 'eventType'),
+        db.Index('ix_match_event_player_id', 'player_id'),
+    )
+
+    def cache_tags(self):
+        return _tags("match", self, 'match_id') | _tags("player", self, 'player_id')
+
     @classmethod
-    def get_match_events(cls, n=None, sort_by="id"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_match_events(cls, n=None, sort_by="id", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
     @classmethod
     def find_events_for_player(cls, player_name):
@@ -699,6 +1032,401 @@ class MatchEvent(db.Model):
             raise ValueError("Wystąpił błąd podczas usuwania wydarzenia.")
 
 
+class Standing(db.Model):
+    """Wiersz tabeli ligowej - aktualizowany przy kazdym zakonczonym meczu."""
+    tournament_id = db.Column(db.Integer, db.ForeignKey(
+        'tournament.id'), primary_key=True)
+    team_id = db.Column(db.Integer, db.ForeignKey(
+        'team.id'), primary_key=True)
+
+    points = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    draws = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    goalsFor = db.Column(db.Integer, nullable=False, default=0)
+    goalsAgainst = db.Column(db.Integer, nullable=False, default=0)
+    played = db.Column(db.Integer, nullable=False, default=0)
+    # Numer grupy w turnieju grupy + play-off (0 - liga)
+    groupNumber = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    tournament = db.relationship('Tournament', back_populates='standings')
+    team = db.relationship('Team')
+
+    def cache_tags(self):
+        return {f"tournament:{self.tournament_id}"}
+
+    @property
+    def goalDifference(self):
+        return self.goalsFor - self.goalsAgainst
+
+    @classmethod
+    def empty(cls, tournament_id, team_id, group_number=0):
+        return cls(tournament_id=tournament_id, team_id=team_id, points=0, wins=0,
+                   draws=0, losses=0, goalsFor=0, goalsAgainst=0, played=0,
+                   groupNumber=group_number)
+
+    @classmethod
+    def record_match(cls, match):
+        """Dopisuje wynik zakonczonego meczu ligowego albo grupowego do tabeli (bez commita)."""
+        tournament = db.session.get(Tournament, match.tournament_id)
+        if tournament.type != 'league' and not match.groupNumber:
+            return
+
+        score_home = int(match.scoreHome)
+        score_away = int(match.scoreAway)
+
+        home = cls._get_or_create(match.tournament_id, match.homeTeam_id, match.groupNumber)
+        away = cls._get_or_create(match.tournament_id, match.awayTeam_id, match.groupNumber)
+        home.add_result(score_home, score_away)
+        away.add_result(score_away, score_home)
+
+    @classmethod
+    def _get_or_create(cls, tournament_id, team_id, group_number=0):
+        standing = db.session.get(cls, (tournament_id, team_id))
+        if not standing:
+            standing = cls.empty(tournament_id, team_id, group_number)
+            db.session.add(standing)
+        return standing
+
+    def add_result(self, goals_for, goals_against):
+        self.played += 1
+        self.goalsFor += goals_for
+        self.goalsAgainst += goals_against
+        if goals_for > goals_against:
+            self.wins += 1
+            self.points += 3
+        elif goals_for < goals_against:
+            self.losses += 1
+        else:
+            self.draws += 1
+            self.points += 1
+
+    @classmethod
+    def rebuild(cls, tournament_id=None):
+        """
+        Przelicza tabele ligowe i grupowe od zera na podstawie zakonczonych meczow.
+        Sluzy do uzupelnienia danych sprzed wprowadzenia tabeli i do naprawy rozjazdow.
+        Zwraca liczbe zapisanych wierszy.
+        """
+        league_ids = db.session.query(Tournament.id).filter(
+            Tournament.type.in_(('league', 'groups_playoff')))
+        if tournament_id is not None:
+            league_ids = league_ids.filter(Tournament.id == tournament_id)
+        league_ids = [t_id for (t_id,) in league_ids]
+
+        cls.query.filter(cls.tournament_id.in_(league_ids)).delete(
+            synchronize_session=False)
+        mark_stale(*(f"tournament:{t_id}" for t_id in league_ids))
+
+        # Mecze drabinki (grupy + play-off) nie licza sie do tabel grup
+        matches = db.session.query(
+            Match.tournament_id, Match.homeTeam_id, Match.awayTeam_id,
+            Match.status, Match.scoreHome, Match.scoreAway, Match.groupNumber
+        ).join(Tournament, Match.tournament_id == Tournament.id).filter(
+            Match.tournament_id.in_(league_ids),
+            (Tournament.type == 'league') | (Match.groupNumber > 0))
+
+        standings = {}
+        for t_id, home_id, away_id, status, score_home, score_away, group in matches:
+            home = standings.setdefault((t_id, home_id), cls.empty(t_id, home_id, group))
+            away = standings.setdefault((t_id, away_id), cls.empty(t_id, away_id, group))
+            if status != 'ended':
+                continue
+            home.add_result(score_home, score_away)
+            away.add_result(score_away, score_home)
+
+        db.session.add_all(standings.values())
+        db.session.commit()
+        return len(standings)
+
+
+class PlayerTournamentStats(db.Model):
+    """
+    Statystyki zawodnika w jednym turnieju - aktualizowane w tej samej transakcji co zdarzenia
+    meczowe i wystepy (Player.goals / Player.appearances to liczniki z calej kariery).
+    """
+    player_id = db.Column(db.Integer, db.ForeignKey('player.id'), primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey('tournament.id'), primary_key=True)
+
+    goals = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    redCards = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    appearances = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Minuty gry - protokol meczu jeszcze ich nie zawiera
+    minutes = db.Column(db.Integer)
+
+    player = db.relationship('Player', back_populates='tournamentStats')
+    tournament = db.relationship('Tournament', back_populates='playerStats')
+
+    # Rankingi strzelcow i kartek turnieju: top-N to skan zakresu indeksu, bez sortowania
+    __table_args__ = (
+        db.Index('ix_player_tournament_stats_goals', tournament_id, goals.desc(), player_id),
+        db.Index('ix_player_tournament_stats_redCards', tournament_id, redCards.desc(), player_id),
+    )
+
+    # Rankingi: nazwa -> kolumna statystyk w turnieju
+    LEADERBOARDS = ('goals', 'redCards')
+
+    def cache_tags(self):
+        return {f"player:{self.player_id}", f"tournament:{self.tournament_id}"}
+
+    @classmethod
+    def leaderboard(cls, stat='goals', tournament_id=None, n=10):
+        """
+        Najlepsi zawodnicy w statystyce stat ('goals' albo 'redCards') - w turnieju albo
+        w calej karierze (tournament_id=None). Lista par (zawodnik z druzyna, wartosc).
+        """
+        if stat not in cls.LEADERBOARDS:
+            raise ValueError(f"Nieznany ranking: {stat}. Dostępne: {', '.join(cls.LEADERBOARDS)}.")
+
+        if tournament_id is not None:
+            value = getattr(cls, stat)
+            query = db.session.query(Player, value).join(cls, cls.player_id == Player.id).filter(
+                cls.tournament_id == tournament_id, value > 0
+            ).order_by(value.desc(), cls.player_id.asc())
+        elif stat == 'goals':
+            # Licznik kariery w Player (indeks ix_player_goals_id)
+            query = db.session.query(Player, Player.goals).filter(
+                Player.goals > 0).order_by(Player.goals.desc(), Player.id.asc())
+        else:
+            # Kartek z calej kariery Player nie liczy - suma z wierszy turniejowych
+            value = func.sum(cls.redCards)
+            query = db.session.query(Player, value).join(cls, cls.player_id == Player.id).group_by(
+                Player.id).having(value > 0).order_by(value.desc(), Player.id.asc())
+
+        return query.options(joinedload(Player.team)).limit(n).all()
+
+    @classmethod
+    def _insert_missing(cls, keys):
+        """Zerowe wiersze dla par (player_id, tournament_id), ktorych jeszcze nie ma - executemany."""
+        keys = set(keys)
+        if not keys:
+            return
+        existing = set(db.session.execute(select(cls.player_id, cls.tournament_id).where(
+            tuple_(cls.player_id, cls.tournament_id).in_(keys))).all())
+        missing = keys - existing
+        if missing:
+            db.session.execute(insert(cls.__table__), [
+                {'player_id': player_id, 'tournament_id': tournament_id,
+                 'goals': 0, 'redCards': 0, 'appearances': 0}
+                for player_id, tournament_id in missing])
+
+    @classmethod
+    def record_events(cls, counts):
+        """
+        Dopisuje zdarzenia meczowe: counts to {(player_id, tournament_id): (gole, czerwone kartki)}.
+        Jedno UPDATE (executemany) dla wszystkich zawodnikow, bez commita.
+        """
+        if not counts:
+            return
+        cls._insert_missing(counts)
+        # UPDATE omija sesje ORM - strony zawodnikow i rankingi turniejow uniewazniamy recznie
+        mark_stale(*(f"player:{player_id}" for player_id, _ in counts),
+                   *(f"tournament:{tournament_id}" for _, tournament_id in counts), "leaderboard")
+
+        table = cls.__table__
+        db.session.execute(
+            update(table).where(
+                table.c.player_id == bindparam('p_id'), table.c.tournament_id == bindparam('t_id')
+            ).values(
+                goals=table.c.goals + bindparam('d_goals'),
+                redCards=table.c.redCards + bindparam('d_red_cards')),
+            [{'p_id': player_id, 't_id': tournament_id, 'd_goals': goals, 'd_red_cards': red_cards}
+             for (player_id, tournament_id), (goals, red_cards) in counts.items()])
+
+    @classmethod
+    def record_appearances(cls, tournament_id, team_ids, times=1):
+        """Zawodnicy z pola podanych druzyn dostaja +times wystepow w turnieju. Bez commita."""
+        field_players = select(Player.id).where(
+            Player.team_id.in_(team_ids), Player.position == 'field')
+
+        table = cls.__table__
+        db.session.execute(insert(table).from_select(
+            ['player_id', 'tournament_id', 'goals', 'redCards', 'appearances'],
+            select(Player.id, literal(tournament_id), literal(0), literal(0), literal(0)).where(
+                Player.id.in_(field_players),
+                Player.id.not_in(select(cls.player_id).where(cls.tournament_id == tournament_id)))))
+        db.session.execute(
+            update(table).where(
+                table.c.tournament_id == tournament_id, table.c.player_id.in_(field_players)
+            ).values(appearances=table.c.appearances + times))
+
+    @classmethod
+    def verify(cls, fix=False):
+        """
+        Porownuje zapisane gole i czerwone kartki z policzonymi od nowa z MatchEvent (jedno
+        zapytanie agregujace). Zwraca rozjazdy [(player_id, tournament_id, pole, zapisane, policzone)];
+        z fix=True od razu je poprawia. Wystepow nie da sie odtworzyc ze zdarzen - nie sa sprawdzane.
+        """
+        actual = {(player_id, tournament_id): (goals, red_cards)
+                  for player_id, tournament_id, goals, red_cards in db.session.execute(
+            select(
+                MatchEvent.player_id, Match.tournament_id,
+                func.sum(case((MatchEvent.eventType == 'goal', 1), else_=0)),
+                func.sum(case((MatchEvent.eventType == 'redCard', 1), else_=0)),
+            ).join(Match, MatchEvent.match_id == Match.id).group_by(
+                MatchEvent.player_id, Match.tournament_id))}
+        stored = {(player_id, tournament_id): (goals, red_cards)
+                  for player_id, tournament_id, goals, red_cards in db.session.execute(
+            select(cls.player_id, cls.tournament_id, cls.goals, cls.redCards))}
+
+        drift = []
+        corrections = {}
+        for key in sorted(actual.keys() | stored.keys()):
+            expected = actual.get(key, (0, 0))
+            current = stored.get(key, (0, 0))
+            for field, have, want in zip(('goals', 'redCards'), current, expected):
+                if have != want:
+                    drift.append((*key, field, have, want))
+            if current != expected:
+                corrections[key] = (expected[0] - current[0], expected[1] - current[1])
+
+        if fix and corrections:
+            cls.record_events(corrections)
+            db.session.commit()
+        return drift
+
+
+class BracketSlot(db.Model):
+    """
+    Miejsce w drabince play-off: para (runda, numer) z linkiem do miejsca w nastepnej
+    rundzie. Zwyciezca miejsca o numerze parzystym gra w rodzicu u siebie, nieparzystym
+    na wyjezdzie. Mecz powstaje, gdy w miejscu sa juz obie druzyny.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    tournament_id = db.Column(db.Integer, db.ForeignKey(
+        'tournament.id'), nullable=False)
+    round = db.Column(db.Integer, nullable=False)
+    slot = db.Column(db.Integer, nullable=False)
+    # Miejsce w nastepnej rundzie (None - final)
+    parent_id = db.Column(db.Integer, db.ForeignKey('bracket_slot.id'))
+
+    homeTeam_id = db.Column(db.Integer, db.ForeignKey('team.id'))
+    awayTeam_id = db.Column(db.Integer, db.ForeignKey('team.id'))
+    match_id = db.Column(db.Integer, db.ForeignKey('match.id'), unique=True)
+
+    tournament = db.relationship('Tournament', back_populates='bracketSlots')
+    parent = db.relationship('BracketSlot', remote_side=[id])
+    home_team = db.relationship('Team', foreign_keys=[homeTeam_id])
+    away_team = db.relationship('Team', foreign_keys=[awayTeam_id])
+    match = db.relationship('Match')
+
+    __table_args__ = (
+        # get_bracket - cala drabinka jednym odczytem z indeksu, w kolejnosci rund
+        db.UniqueConstraint('tournament_id', 'round', 'slot', name='uq_bracket_slot'),
+    )
+
+    def cache_tags(self):
+        return {f"tournament:{self.tournament_id}"}
+
+    @classmethod
+    def create(cls, tournament_id, pairs):
+        """
+        Tworzy cala drabinke z gory: po jednym miejscu na kazda pare pierwszej rundy,
+        w kazdej kolejnej rundzie o polowe mniej, az do finalu. Para z wolnym losem (None)
+        nie gra - druzyna od razu trafia do drugiej rundy. Mecze, ktorych obie druzyny
+        sa juz znane, powstaja od razu. Wstawianie przez Core insert (executemany),
+        po jednym zapytaniu na runde. Bez commita.
+        """
+        size = len(pairs)
+        if size < 1 or size & (size - 1):
+            raise ValueError("Liczba par w pierwszej rundzie drabinki musi być potęgą liczby 2.")
+        rounds = size.bit_length()
+
+        # Druzyny w miejscach kazdej rundy: teams[runda - 1][miejsce] = [gospodarz, gosc]
+        teams = [[list(pair) for pair in pairs]]
+        teams += [[[None, None] for _ in range(size >> round)] for round in range(1, rounds)]
+        if rounds > 1:
+            for slot, (home_id, away_id) in enumerate(pairs):
+                if home_id is None and away_id is None:
+                    raise ValueError("Para w drabince nie może składać się z dwóch wolnych losów.")
+                if home_id is None or away_id is None:
+                    teams[1][slot // 2][slot % 2] = home_id if away_id is None else away_id
+
+        mark_stale(f"tournament:{tournament_id}")
+        match_keys = []
+        match_rows = []
+        for round, round_teams in enumerate(teams[:2], start=1):
+            for slot, (home_id, away_id) in enumerate(round_teams):
+                if home_id is not None and away_id is not None:
+                    match_keys.append((round, slot))
+                    match_rows.append({
+                        'homeTeam_id': home_id, 'awayTeam_id': away_id, 'tournament_id': tournament_id,
+                        'status': 'planned', 'scoreHome': None, 'scoreAway': None, 'round': round,
+                    })
+                    mark_stale(f"team:{home_id}", f"team:{away_id}")
+        match_ids = {}
+        if match_rows:
+            table = Match.__table__
+            inserted = db.session.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), match_rows)
+            match_ids = dict(zip(match_keys, inserted.scalars()))
+
+        # Od finalu w dol - id miejsca rodzica jest znane przed wstawieniem jego dzieci
+        table = cls.__table__
+        statement = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+        parent_ids = []
+        for round in range(rounds, 0, -1):
+            rows = [{
+                'tournament_id': tournament_id,
+                'round': round,
+                'slot': slot,
+                'parent_id': parent_ids[slot // 2] if parent_ids else None,
+                'homeTeam_id': home_id,
+                'awayTeam_id': away_id,
+                'match_id': match_ids.get((round, slot)),
+            } for slot, (home_id, away_id) in enumerate(teams[round - 1])]
+            parent_ids = db.session.execute(statement, rows).scalars().all()
+        return len(match_rows)
+
+    @classmethod
+    def advance(cls, match):
+        """
+        Wpisuje zwyciezce zakonczonego meczu do miejsca w nastepnej rundzie, a gdy
+        sa tam juz obie druzyny - od razu tworzy ich mecz. Dla meczow spoza drabinki
+        nic nie robi. Bez commita.
+        """
+        slot = cls.query.options(joinedload(cls.parent)).filter(cls.match_id == match.id).first()
+        if slot is None:
+            return None
+
+        if match.scoreHome == match.scoreAway:
+            raise ValueError(
+                "Mecz zakończył się remisem, co nie jest dozwolone w turnieju play-off.")
+        winner_id = match.homeTeam_id if match.scoreHome > match.scoreAway else match.awayTeam_id
+
+        parent = slot.parent
+        if parent is None:
+            return None
+
+        if slot.slot % 2 == 0:
+            parent.homeTeam_id = winner_id
+        else:
+            parent.awayTeam_id = winner_id
+
+        if parent.homeTeam_id and parent.awayTeam_id and parent.match_id is None:
+            parent.match = Match(homeTeam_id=parent.homeTeam_id, awayTeam_id=parent.awayTeam_id,
+                                 tournament_id=parent.tournament_id, status='planned',
+                                 scoreHome=None, scoreAway=None, round=parent.round)
+            tournament = match.tournament
+            tournament.round = max(tournament.round or 1, parent.round)
+            return parent.match
+        return None
+
+    @classmethod
+    def get_bracket(cls, tournament_id):
+        """Cala drabinka (miejsca z druzynami i meczami) jednym zapytaniem, runda po rundzie."""
+        return cls.query.options(
+            joinedload(cls.home_team), joinedload(cls.away_team), joinedload(cls.match)
+        ).filter(
+            cls.tournament_id == tournament_id
+        ).order_by(cls.round.asc(), cls.slot.asc()).all()
+
+    @classmethod
+    def get_final(cls, tournament_id):
+        return cls.query.options(joinedload(cls.match)).filter(
+            cls.tournament_id == tournament_id, cls.parent_id.is_(None)).first()
+
+
 class Coach(db.Model, UserMixin):
     id = db.Column(db.Integer, primary_key=True)
     firstName = db.Column(db.String(50), nullable=False)
@@ -709,20 +1437,28 @@ class Coach(db.Model, UserMixin):
 
     login = db.Column(db.String(30), nullable=False)
     password = db.Column(db.String(50), nullable=False)
+    searchName = db.Column(db.String(102))
+
+    __table_args__ = (
+        db.Index('ix_coach_lastName_id', 'lastName', 'id'),
+        db.Index('ix_coach_searchName_trgm', 'searchName', postgresql_using='gin',
+                 postgresql_ops={'searchName': 'gin_trgm_ops'}),
+    )
+
+    _search_fields = ('firstName', 'lastName')
+
+    def cache_tags(self):
+        return {f"coach:{self.id}"} | _tags("team", self, 'team_id')
 
     @classmethod
-    def get_coaches(cls, n=None, sort_by="lastName"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_coaches(cls, n=None, sort_by="lastName", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
     @classmethod
     def find_coach(cls, query):
         """Szukamy trenera po imieniu i nazwisku."""
-        return cls.query.filter(
-            (cls.firstName + ' ' + cls.lastName).like(f"%{query}%")
-        ).all()
+        from .services.search import search
+        return search(cls, query)
 
     # Znajduje trenera po ID
     @classmethod
@@ -749,8 +1485,20 @@ class Referee(db.Model):
     firstName = db.Column(db.String(50), nullable=False)
     lastName = db.Column(db.String(50), nullable=False)
     age = db.Column(db.Integer)
+    searchName = db.Column(db.String(102))
     matches = db.relationship('Match', back_populates='referee')
 
+    __table_args__ = (
+        db.Index('ix_referee_lastName_id', 'lastName', 'id'),
+        db.Index('ix_referee_searchName_trgm', 'searchName', postgresql_using='gin',
+                 postgresql_ops={'searchName': 'gin_trgm_ops'}),
+    )
+
+    _search_fields = ('firstName', 'lastName')
+
+    def cache_tags(self):
+        return {f"referee:{self.id}"}
+
     @classmethod
     def find_ref(cls, query):
         """Znajdź sędziego na podstawie imienia i nazwiska."""
@@ -771,11 +1519,72 @@ class Referee(db.Model):
 
     
     @classmethod
-    def get_refs(cls, n = None, sort_by = "lastName"):
-        query = cls.query.order_by(getattr(cls, sort_by).asc())
-        if n:
-            query = query.limit(n)
-        return query.all()
+    def get_refs(cls, n=None, sort_by="lastName", after=None, before=None):
+        return _get_sorted(cls, n, sort_by, after, before)
 
         
         
+
+
+# Wyszukiwanie -----------------------------------------------------------------------------------------------------
+
+SEARCHABLE_MODELS = (Player, Coach, Referee, Team)
+
+
+def _set_search_name(mapper, connection, target):
+    target.searchName = normalize_name(
+        *(getattr(target, field) for field in target._search_fields))
+
+
+for _model in SEARCHABLE_MODELS:
+    event.listen(_model, 'before_insert', _set_search_name)
+    event.listen(_model, 'before_update', _set_search_name)
+
+# Indeksy trigramowe na PostgreSQL wymagaja rozszerzenia pg_trgm
+event.listen(db.metadata, 'before_create', DDL(
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm').execute_if(dialect='postgresql'))
+
+
+# Wersje stron (ETag) ----------------------------------------------------------------------------------------------
+
+@event.listens_for(Session, 'before_commit')
+def _bump_revisions(session):
+    """
+    Przed commitem zwieksza revision turniejow, druzyn i meczow, ktorych dotycza tagi
+    zebrane dla cache (app.cache) - czyli dokladnie tych stron, ktore sie zmienily.
+    """
+    session.flush()
+    tags = session.info.get('stale_cache_tags')
+    if not tags:
+        return
+
+    ids = {}
+    for tag in tags:
+        prefix, _, id = tag.partition(':')
+        if id.isdigit():
+            ids.setdefault(prefix, set()).add(int(id))
+
+    statements = []
+    if ids.get('tournament'):
+        statements.append(update(Tournament).where(Tournament.id.in_(ids['tournament'])))
+    if ids.get('referee'):
+        # Nazwiska sedziow widac na stronie turnieju
+        statements.append(update(Tournament).where(Tournament.id.in_(
+            select(Match.tournament_id).where(Match.referee_id.in_(ids['referee'])))))
+    teams = ids.get('team', set()) | ids.get('roster', set())
+    if teams:
+        statements.append(update(Team).where(Team.id.in_(teams)))
+    if ids.get('match'):
+        statements.append(update(Match).where(Match.id.in_(ids['match'])))
+    if ids.get('player'):
+        # Nazwiska zawodnikow widac przy zdarzeniach na stronie meczu i w rankingach turniejow
+        statements.append(update(Match).where(Match.id.in_(
+            select(MatchEvent.match_id).where(MatchEvent.player_id.in_(ids['player'])))))
+        statements.append(update(Tournament).where(Tournament.id.in_(
+            select(PlayerTournamentStats.tournament_id).where(
+                PlayerTournamentStats.player_id.in_(ids['player'])))))
+
+    for statement in statements:
+        session.execute(
+            statement.values(revision=statement.table.c.revision + 1),
+            execution_options={'synchronize_session': False})
@@ -0,0 +1,153 @@
+"""
+Pula polaczen z baza danych: ustawienia z konfiguracji (DB_POOL_*, DB_STATEMENT_TIMEOUT)
+i telemetria zbierana ze zdarzen puli SQLAlchemy - liczniki polaczen, stan puli
+(wypozyczone / ponad limit) i czas oczekiwania na wolne polaczenie. Adminom dostepne
+pod /admin/metrics/pool.
+"""
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+# Gorne granice przedzialow histogramu czasu oczekiwania [s]
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class PoolMetrics:
+    """Liczniki zdarzen puli i rozklad czasu oczekiwania na polaczenie."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def observe_wait(self, seconds):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if seconds <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            else:
+                self.wait_buckets[-1] += 1
+
+    def snapshot(self, pool):
+        """Liczniki i biezacy stan puli (pola puli tylko dla QueuePool)."""
+        with self._lock:
+            data = {
+                'connects': self.connects,
+                'checkouts': self.checkouts,
+                'checkins': self.checkins,
+                'invalidations': self.invalidations,
+                'timeouts': self.timeouts,
+                'wait': {
+                    'count': self.wait_count,
+                    'total': self.wait_total,
+                    'max': self.wait_max,
+                    'buckets': dict(zip([*map(str, WAIT_BUCKETS), '+Inf'], self.wait_buckets)),
+                },
+            }
+        data['pool'] = {'class': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            data['pool'].update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'checked_in': pool.checkedin(),
+                'overflow': pool.overflow(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool.timeout(),
+            })
+        return data
+
+
+# Stan mierzonego _do_get w watku: czas otwierania nowych polaczen DBAPI (nie wlicza sie
+# do czekania) i flaga, ze pomiar juz trwa
+_created = threading.local()
+
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool mierzacy, ile watek czekal na wolne miejsce w puli (i ile razy sie nie doczekal).
+    Mierzone jest tylko _do_get bez otwierania nowych polaczen - pre-ping i zdarzenia
+    checkout nie zawyzaja czasu oczekiwania.
+    """
+
+    metrics = None
+
+    def _do_get(self):
+        # QueuePool._do_get ponawia probe, wywolujac self._do_get() - ponowienia naleza do
+        # mierzonego wywolania zewnetrznego, inaczej jedno czekanie liczyloby sie kilka razy
+        if self.metrics is None or getattr(_created, 'timing', False):
+            return super()._do_get()
+        _created.timing = True
+        _created.seconds = 0.0
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.count('timeouts')
+            raise
+        finally:
+            _created.timing = False
+            self.metrics.observe_wait(max(time.perf_counter() - start - _created.seconds, 0.0))
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            _created.seconds = getattr(_created, 'seconds', 0.0) + time.perf_counter() - start
+
+    def recreate(self):
+        # engine.dispose() tworzy nowa pule - telemetria przechodzi razem z nia
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def engine_options(config):
+    """Opcje create_engine z ustawien DB_POOL_* (dla SQLite w pamieci profil ustawia StaticPool sam)."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config.get('DB_POOL_SIZE', 5),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', -1),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', False),
+    }
+    statement_timeout = config.get('DB_STATEMENT_TIMEOUT')
+    if statement_timeout and url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f"-c statement_timeout={int(statement_timeout)}"}
+    return options
+
+
+def init_pool_metrics(app, engine):
+    metrics = PoolMetrics()
+    pool = engine.pool
+    if isinstance(pool, TimedQueuePool):
+        pool.metrics = metrics
+
+    # Zdarzenia rejestrowane na puli zostaja tez po engine.dispose()
+    event.listen(pool, 'connect', lambda *args: metrics.count('connects'))
+    event.listen(pool, 'checkout', lambda *args: metrics.count('checkouts'))
+    event.listen(pool, 'checkin', lambda *args: metrics.count('checkins'))
+    event.listen(pool, 'invalidate', lambda *args: metrics.count('invalidations'))
+
+    app.extensions['pool_metrics'] = metrics
+    return metrics
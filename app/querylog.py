@@ -0,0 +1,103 @@
+"""
+Licznik zapytan SQL na zadanie HTTP i log wolnych zapytan.
+
+Zdarzenia before/after_cursor_execute silnika mierza kazde zapytanie; w czasie obslugi
+zadania liczba zapytan, laczny czas bazy i najwolniejsze zapytania trafiaja do g.
+Zadanie przekraczajace QUERY_LOG_MAX_QUERIES albo QUERY_LOG_MAX_DB_TIME jest logowane
+razem z najwolniejszymi zapytaniami - tak widac regresje N+1. Pojedyncze zapytanie
+dluzsze niz SLOW_QUERY_TIME jest logowane od razu. W trybie debug (albo z SERVER_TIMING)
+odpowiedz dostaje naglowek Server-Timing z czasem bazy.
+"""
+import heapq
+import time
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+
+class QueryStats:
+    """Zapytania jednego zadania: liczba, laczny czas i `keep` najwolniejszych."""
+
+    __slots__ = ('count', 'total', 'slowest', 'keep')
+
+    def __init__(self, keep=5):
+        self.count = 0
+        self.total = 0.0
+        self.slowest = []  # kopiec (czas, zapytanie)
+        self.keep = keep
+
+    def add(self, statement, duration):
+        self.count += 1
+        self.total += duration
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, (duration, statement))
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (duration, statement))
+
+    def top(self):
+        return sorted(self.slowest, reverse=True)
+
+
+def _shorten(statement, length=300):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + '...'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', []).append((context, time.perf_counter()))
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info['query_start'].pop()[1]
+    if not has_request_context():
+        return
+
+    stats = g.get('query_stats')
+    if stats is not None:
+        stats.add(statement, duration)
+
+    if duration >= current_app.config.get('SLOW_QUERY_TIME', 0.1):
+        current_app.logger.warning("Wolne zapytanie (%.1f ms) w %s %s: %s",
+                                   duration * 1000, request.method, request.path, _shorten(statement))
+
+
+def _handle_error(context):
+    # Nieudane zapytanie nie dochodzi do after_cursor_execute - jego start nie moze zostac
+    # na polaczeniu z puli, bo kolejne czasy parowalyby sie z niewlasciwym startem. Blad
+    # sprzed before_cursor_execute (np. przy tworzeniu kursora) nie zostawil startu.
+    conn = context.connection
+    if conn is None:
+        return
+    starts = conn.info.get('query_start')
+    if starts and starts[-1][0] is context.execution_context:
+        starts.pop()
+
+
+def init_query_log(app, engine):
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def _start_query_stats():
+        g.query_stats = QueryStats(app.config.get('QUERY_LOG_SLOWEST', 5))
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.get('query_stats')
+        if stats is None:
+            return response
+
+        if (stats.count > app.config.get('QUERY_LOG_MAX_QUERIES', 50)
+                or stats.total > app.config.get('QUERY_LOG_MAX_DB_TIME', 0.5)):
+            app.logger.warning(
+                "%s %s: %d zapytan SQL, %.1f ms w bazie. Najwolniejsze:\n%s",
+                request.method, request.path, stats.count, stats.total * 1000,
+                "\n".join(f"  {duration * 1000:.1f} ms  {_shorten(statement)}"
+                          for duration, statement in stats.top()))
+
+        server_timing = app.config.get('SERVER_TIMING')
+        if server_timing or (server_timing is None and app.debug):
+            response.headers.add(
+                'Server-Timing', f'db;dur={stats.total * 1000:.1f};desc="{stats.count} zapytan SQL"')
+        return response
@@ -1,5 +1,7 @@
-from app.models import Player, Tournament, Team, Coach, Match, MatchEvent, Referee
+from app.models import (Player, Tournament, Team, Coach, Match, MatchEvent, Referee, Standing,
+                        PlayerTournamentStats)
 from app import db
+from app.live import publish_after_commit
 
 
 # Funkcja dodawania zawodnika do bazy
@@ -16,10 +18,14 @@ def create_player(firstName, lastName, age):
     db.session.add(new_player)
     db.session.commit()
 
-def create_tournament(name, type, status):
+def create_tournament(name, type, status, legs=2, draw_seed=None, seeding_tournament_id=None,
+                      groups=None, advancing=None):
     if len(name) > 100:
         raise ValueError('Nazwa turnieju jest za długa!')
 
+    if int(legs) not in (1, 2):
+        raise ValueError('Liga może mieć jedną albo dwie rundy!')
+
     if Tournament.query.filter_by(name=name).first():
         raise ValueError(f"Turniej o nazwie '{name}' już istnieje!")
 
@@ -29,10 +35,38 @@ def create_tournament(name, type, status):
     elif type == 'Turniej pucharowy':
         type = 'playoff'
         round = 1
+    elif type == 'Grupy + play-off':
+        type = 'groups_playoff'
+        round = None
     else:
         raise ValueError('Błąd formatu!')
 
-    new_tournament = Tournament(name=name, type=type, status=status, round=round)
+    if type == 'league':
+        draw_seed = seeding_tournament_id = None
+
+    if type == 'groups_playoff':
+        groups, advancing = int(groups or 0), int(advancing or 0)
+        if groups < 1 or advancing < 1:
+            raise ValueError('Podaj liczbę grup i liczbę drużyn awansujących z grupy!')
+        if groups * advancing < 2:
+            raise ValueError('Do fazy pucharowej muszą awansować co najmniej dwie drużyny!')
+    else:
+        groups = advancing = None
+
+    # Rozstawienie według tabeli istniejącej ligi
+    if seeding_tournament_id:
+        seeding = Tournament.find_tournament_by_id(seeding_tournament_id)
+        if seeding.type != 'league':
+            raise ValueError('Rozstawienie można wziąć tylko z tabeli ligi!')
+
+    # Ziarno losowania - puste oznacza losowe, wybrane przy generowaniu drabinki
+    if draw_seed is not None and not 0 <= int(draw_seed) < 2 ** 63:
+        raise ValueError('Nieprawidłowe ziarno losowania!')
+
+    new_tournament = Tournament(name=name, type=type, status=status, round=round, legs=int(legs),
+                                drawSeed=int(draw_seed) if draw_seed is not None else None,
+                                seedingTournament_id=seeding_tournament_id or None,
+                                groups=groups, advancing=advancing)
     db.session.add(new_tournament)
     db.session.commit()
     return new_tournament
@@ -111,79 +145,132 @@ def create_match(homeTeam_id, awayTeam_id, scoreHome, scoreAway, status):
         status=status,
         tournament_id=tournament_id
     )
-    '''Dodać do aktualizuj status meczu'''
-    players_home = home_team.players
-    players_away = away_team.players
-    for player in players_home:
-        if player.position =="field":
-            player.appearances+=1
-        if player.status == "suspended":
-            player.status == "active"
-    for player in players_away:
-        if player.position == "field":
-            player.appearances+=1 
-        if player.status == "suspended":
-            player.status == "active"
+    # Występy i koniec zawieszeń dla obu składów - set-based UPDATE zamiast pętli
+    Player.record_appearances([homeTeam_id, awayTeam_id], tournament_id=tournament_id)
 
     # Zapis do bazy danych
     db.session.add(new_match)
+    if status == 'ended':
+        Standing.record_match(new_match)
     db.session.commit()
 
     return new_match
 
 def create_match_event(eventType, match_id, player_id):
-
+    return create_match_events(match_id, [(eventType, player_id)])[0]
+
+def create_match_events(match_id, events, end_match=False):
+    """
+    Dodaje cały protokół meczu naraz: events to lista par (eventType, player_id).
+    Całość jest walidowana przed zapisem, a zdarzenia, liczniki goli i zawieszenia
+    trafiają do bazy jednym commitem. Z end_match=True mecz jest od razu kończony
+    (status 'ended' + tabela ligowa) w tej samej transakcji.
+    """
     match = Match.query.get(match_id)
     if not match:
         raise ValueError(f"Mecz o ID {match_id} nie istnieje.")
-    
+
     # Pobranie turnieju
     tournament = match.tournament
     if not tournament:
         raise ValueError(f"Turniej dla meczu o ID {match_id} nie istnieje.")
 
-    # Zabezpieczenie przed dodawaniem wydarzeń, jeśli wygenerowano kolejną rundę
-    if tournament.type == 'playoff' and tournament.round > match.round:
+    # Zabezpieczenie przed dodawaniem wydarzeń, gdy zwycięzca awansował już w drabince
+    if match.is_knockout and match.status == 'ended':
         raise ValueError(
-            "Nie można dodawać wydarzeń do meczu, ponieważ następna runda turnieju została już wygenerowana."
+            "Nie można dodawać wydarzeń do meczu, ponieważ zwycięzca awansował już do następnej rundy."
         )
-    
-    
-    # Sprawdzenie, czy można dodać kolejny gol
-    if eventType == "goal":
-        # Zliczanie istniejących wydarzeń typu "goal" w meczu
-        current_home_goals = len([
-            event for event in match.matchEvents 
-            if event.eventType == "goal" and event.player_id in [player.id for player in match.home_team.players]
-        ])
-        current_away_goals = len([
-            event for event in match.matchEvents 
-            if event.eventType == "goal" and event.player_id in [player.id for player in match.away_team.players]
-        ])
-
-        # Sprawdzenie, czy dodanie kolejnego gola jest możliwe
-        if (current_home_goals and current_home_goals >= match.scoreHome) and (current_away_goals and current_away_goals >= match.scoreAway):
-            raise ValueError(f"Nie można dodać kolejnego gola, wynik meczu już został osiągnięty.")
-
-    new_match_event = MatchEvent(
-        eventType=eventType,
-        match_id=match_id,
-        player_id=player_id
-    )
 
-    player = Player.query.get(player_id)
-    if not player:
-        raise ValueError(f"Zawodnik o ID {player_id} nie istnieje.")
-    
-    if eventType == "goal":
-        player.goals+=1
-    elif eventType == "redCard":
-        player.status = "suspended"
-    
-    db.session.add(new_match_event)
+    if end_match and match.status == 'ended':
+        raise ValueError("Mecz już został zakończony.")
+
+    team_ids = [match.homeTeam_id, match.awayTeam_id]
+    new_events = validate_match_events(
+        match, events, team_of_player(team_ids), recorded_goals([match.id]))
+
+    apply_match_events(new_events)
+
+    if end_match:
+        Match.end_match(match)
+
     db.session.commit()
 
-    return new_match_event
+    return new_events
+
+def team_of_player(team_ids):
+    """Słownik player_id -> team_id dla składów podanych drużyn (jedno zapytanie)."""
+    return dict(db.session.query(Player.id, Player.team_id).filter(
+        Player.team_id.in_(team_ids)))
+
+def recorded_goals(match_ids):
+    """Gole już zapisane w meczach (np. wcześniejsze pojedyncze zdarzenia): (match_id, team_id) -> liczba."""
+    rows = db.session.query(MatchEvent.match_id, Player.team_id, db.func.count(MatchEvent.id)).join(
+        MatchEvent.player).filter(
+        MatchEvent.match_id.in_(match_ids),
+        MatchEvent.eventType == 'goal'
+    ).group_by(MatchEvent.match_id, Player.team_id)
+    return {(match_id, team_id): count for match_id, team_id, count in rows}
+
+def validate_match_events(match, events, players_teams, goals_so_far):
+    """
+    Sprawdza protokół meczu i zwraca gotowe (niezapisane) obiekty MatchEvent.
+    Przynależność zawodników sprawdzana jest na wcześniej policzonych słownikach
+    (players_teams / goals_so_far), więc walidacja nie robi własnych zapytań.
+    """
+    goals = {team_id: goals_so_far.get((match.id, team_id), 0)
+             for team_id in (match.homeTeam_id, match.awayTeam_id)}
+
+    limits = {match.homeTeam_id: match.scoreHome, match.awayTeam_id: match.scoreAway}
+    new_events = []
+    for eventType, player_id in events:
+        if eventType not in ('goal', 'redCard'):
+            raise ValueError(f"Nieznany typ zdarzenia: {eventType}.")
+
+        team_id = players_teams.get(player_id)
+        if team_id not in goals:
+            raise ValueError(
+                f"Zawodnik o ID {player_id} nie gra w żadnej z drużyn meczu {match.id}.")
+
+        # Sprawdzenie, czy można dodać kolejny gol
+        if eventType == 'goal':
+            goals[team_id] += 1
+            limit = limits[team_id]
+            if limit is not None and goals[team_id] > int(limit):
+                raise ValueError(
+                    f"Nie można dodać kolejnego gola, wynik meczu już został osiągnięty.")
+
+        new_events.append(MatchEvent(
+            eventType=eventType,
+            match_id=match.id,
+            player_id=player_id
+        ))
+
+    return new_events
+
+def apply_match_events(new_events):
+    """Aktualizuje liczniki goli i zawieszenia zawodników i dodaje zdarzenia do sesji (bez commita)."""
+    player_ids = {event.player_id for event in new_events}
+    players = {player.id: player for player in Player.query.filter(Player.id.in_(player_ids))}
+
+    # Statystyki w turniejach: (player_id, tournament_id) -> [gole, czerwone kartki]
+    stats = {}
+    for event in new_events:
+        player = players[event.player_id]
+        # Mecz jest juz w identity map sesji (walidacja), get() nie robi zapytania
+        match = db.session.get(Match, event.match_id)
+        counts = stats.setdefault((player.id, match.tournament_id), [0, 0])
+        if event.eventType == "goal":
+            player.goals = (player.goals or 0) + 1
+            counts[0] += 1
+        elif event.eventType == "redCard":
+            player.status = "suspended"
+            counts[1] += 1
+        # Na zywo po commicie transakcji wywolujacego
+        publish_after_commit(match, "event", eventType=event.eventType,
+                             player_id=player.id, player=f"{player.firstName} {player.lastName}")
+
+    PlayerTournamentStats.record_events({key: tuple(counts) for key, counts in stats.items()})
+    db.session.add_all(new_events)
 
 def create_referee(firstName, lastName, age):
     if len(firstName) > 50 or len(firstName) < 1:
@@ -0,0 +1,108 @@
+from collections import Counter
+
+from sqlalchemy.orm import joinedload
+
+from app.models import Match, Player
+from app.services.create import team_of_player, recorded_goals, validate_match_events, apply_match_events
+from app import db
+
+
+def parse_matchday_records(records):
+    """
+    Zamienia surowe rekordy (z JSON-a lub pliku) na krotki
+    (match_id, scoreHome, scoreAway, [(eventType, player_id), ...]).
+    """
+    if not isinstance(records, list) or not records:
+        raise ValueError("Oczekiwano niepustej listy wyników meczów.")
+
+    parsed = []
+    for i, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            raise ValueError(f"Rekord {i}: oczekiwano obiektu z wynikiem meczu.")
+        try:
+            match_id = int(record['match_id'])
+            score_home = int(record['scoreHome'])
+            score_away = int(record['scoreAway'])
+            events = []
+            for event in record.get('events') or []:
+                if isinstance(event, dict):
+                    events.append((event['eventType'], int(event['player_id'])))
+                else:
+                    event_type, player_id = event
+                    events.append((event_type, int(player_id)))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(
+                f"Rekord {i}: wymagane pola to match_id, scoreHome, scoreAway i opcjonalnie events.")
+
+        if score_home < 0 or score_away < 0:
+            raise ValueError(f"Rekord {i}: wynik nie może być ujemny.")
+        parsed.append((match_id, score_home, score_away, events))
+
+    return parsed
+
+
+def finish_matchday(records):
+    """
+    Zapisuje wyniki wielu meczów (np. całej kolejki) w jednej transakcji.
+    Wszystkie rekordy są walidowane przed zapisem - jeden błąd odrzuca całą paczkę.
+    Zwraca listę zakończonych meczów.
+    """
+    parsed = parse_matchday_records(records)
+
+    match_ids = [match_id for match_id, _, _, _ in parsed]
+    if len(set(match_ids)) != len(match_ids):
+        raise ValueError("Ten sam mecz występuje w paczce więcej niż raz.")
+
+    matches = {match.id: match for match in Match.query.options(
+        joinedload(Match.tournament)).filter(Match.id.in_(match_ids))}
+
+    for match_id, score_home, score_away, _ in parsed:
+        match = matches.get(match_id)
+        if not match:
+            raise ValueError(f"Mecz o ID {match_id} nie istnieje.")
+        if match.status != 'planned':
+            raise ValueError(f"Mecz o ID {match_id} już został zakończony.")
+        if not match.referee_id:
+            raise ValueError(f"Mecz o ID {match_id} nie ma przypisanego sędziego.")
+        if match.is_knockout and score_home == score_away:
+            raise ValueError(
+                f"Mecz o ID {match_id}: remis nie jest dozwolony w turnieju play-off.")
+
+    # Składy i dotychczasowe gole wszystkich meczów kolejki - po jednym zapytaniu
+    team_ids = Counter()
+    for match in matches.values():
+        team_ids[match.homeTeam_id] += 1
+        team_ids[match.awayTeam_id] += 1
+    players_teams = team_of_player(list(team_ids))
+    goals_so_far = recorded_goals(match_ids)
+
+    try:
+        new_events = []
+        for match_id, score_home, score_away, events in parsed:
+            match = matches[match_id]
+            match.scoreHome = score_home
+            match.scoreAway = score_away
+            new_events += validate_match_events(match, events, players_teams, goals_so_far)
+
+        # Najpierw występy i koniec starych zawieszeń, dopiero potem nowe czerwone kartki.
+        # Drużyna grająca w paczce kilka razy dostaje tyle występów, ile meczów rozegrała.
+        tournament_of = {}
+        for match in matches.values():
+            tournament_of[match.homeTeam_id] = tournament_of[match.awayTeam_id] = match.tournament_id
+        by_times = {}
+        for team_id, times in team_ids.items():
+            by_times.setdefault((times, tournament_of[team_id]), []).append(team_id)
+        for (times, tournament_id), ids in by_times.items():
+            Player.record_appearances(ids, times, tournament_id)
+
+        apply_match_events(new_events)
+
+        for match in matches.values():
+            Match.end_match(match)
+
+        db.session.commit()
+    except ValueError:
+        db.session.rollback()
+        raise
+
+    return [matches[match_id] for match_id in match_ids]
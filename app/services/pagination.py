@@ -0,0 +1,78 @@
+import base64
+import json
+
+from flask import current_app, request
+
+
+class Page:
+    """Jedna strona listy razem z kursorami do sasiednich stron."""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, per_page=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.per_page = per_page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def encode_cursor(value, id):
+    raw = json.dumps([value, id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        value, id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(id)
+    except (ValueError, TypeError):
+        raise ValueError("Nieprawidłowy kursor strony.")
+
+
+def page_size():
+    """Rozmiar strony z ?per_page=, ograniczony przez PAGE_SIZE / MAX_PAGE_SIZE z konfiguracji."""
+    default = current_app.config.get('PAGE_SIZE', 50)
+    maximum = current_app.config.get('MAX_PAGE_SIZE', 200)
+    per_page = request.args.get('per_page', type=int) or default
+    return max(1, min(per_page, maximum))
+
+
+def paginate(getter, sort_by):
+    """
+    Pobiera strone przez metode get_* modelu (np. Player.get_players) uzywajac
+    kursorow ?after= / ?before= kodujacych klucz (sort_by, id) ostatniego wiersza.
+    Pobieramy o jeden wiersz wiecej, zeby wiedziec czy istnieje kolejna strona.
+    """
+    per_page = page_size()
+    after = decode_cursor(request.args.get('after'))
+    before = None if after else decode_cursor(request.args.get('before'))
+
+    items = getter(n=per_page + 1, sort_by=sort_by, after=after, before=before)
+
+    if before:
+        has_prev = len(items) > per_page
+        items = items[-per_page:]
+        has_next = True
+    else:
+        has_next = len(items) > per_page
+        items = items[:per_page]
+        has_prev = after is not None
+
+    def cursor(item):
+        return encode_cursor(getattr(item, sort_by), item.id)
+
+    return Page(
+        items,
+        next_cursor=cursor(items[-1]) if has_next and items else None,
+        prev_cursor=cursor(items[0]) if has_prev and items else None,
+        per_page=request.args.get('per_page', type=int)
+    )
@@ -0,0 +1,62 @@
+from sqlalchemy import func, select, text
+
+from app.models import Match, MatchEvent, BracketSlot, Player, PlayerTournamentStats
+from app import db
+
+
+def hot_paths():
+    """Zapytania z najczesciej uzywanych sciezek, z przykladowymi parametrami."""
+    return {
+        'Match.find_match / add_match': select(Match).where(
+            Match.homeTeam_id == 1, Match.awayTeam_id == 2, Match.tournament_id == 1),
+        'Tournament.finish (planned)': select(func.count(Match.id)).where(
+            Match.tournament_id == 1, Match.status == 'planned'),
+        'Tournament.finish (playoff final)': select(BracketSlot).where(
+            BracketSlot.tournament_id == 1, BracketSlot.parent_id.is_(None)),
+        'BracketSlot.advance': select(BracketSlot).where(BracketSlot.match_id == 1),
+        'BracketSlot.get_bracket': select(BracketSlot).where(
+            BracketSlot.tournament_id == 1).order_by(BracketSlot.round, BracketSlot.slot),
+        'Match.get_round': select(Match).where(
+            Match.tournament_id == 1, Match.round == 1),
+        'Team.away_matches': select(Match).where(Match.awayTeam_id == 1),
+        'referee_details': select(Match).where(Match.referee_id == 1),
+        'match_details': select(MatchEvent).where(MatchEvent.match_id == 1),
+        'player_details': select(MatchEvent).where(MatchEvent.player_id == 1),
+        'leaderboard (tournament)': select(PlayerTournamentStats.player_id).where(
+            PlayerTournamentStats.tournament_id == 1, PlayerTournamentStats.goals > 0
+        ).order_by(PlayerTournamentStats.goals.desc(), PlayerTournamentStats.player_id).limit(10),
+        'leaderboard (global)': select(Player.id).where(Player.goals > 0).order_by(
+            Player.goals.desc(), Player.id).limit(10),
+    }
+
+
+def _explain(connection, statement):
+    sql = str(statement.compile(dialect=connection.dialect,
+                                compile_kwargs={'literal_binds': True}))
+
+    if connection.dialect.name == 'postgresql':
+        # Na malych tabelach planista i tak wybierze seq scan - sprawdzamy, czy indeks w ogole pasuje
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+        plan = [row[0] for row in connection.execute(text(f'EXPLAIN {sql}'))]
+        return plan, not any('Seq Scan' in line for line in plan)
+
+    if connection.dialect.name == 'sqlite':
+        plan = [row[-1] for row in connection.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+        full_scan = any(line.startswith('SCAN') and 'INDEX' not in line for line in plan)
+        return plan, not full_scan
+
+    raise ValueError(f"Brak obsługi EXPLAIN dla bazy {connection.dialect.name}.")
+
+
+def check_query_plans():
+    """
+    Uruchamia EXPLAIN dla kazdej goracej sciezki.
+    Zwraca liste (nazwa, plan, czy_uzywa_indeksu).
+    """
+    results = []
+    with db.engine.connect() as connection:
+        for name, statement in hot_paths().items():
+            with connection.begin():
+                plan, uses_index = _explain(connection, statement)
+            results.append((name, plan, uses_index))
+    return results
@@ -0,0 +1,155 @@
+"""
+Tabele turniejow z kryteriami rozstrzygajacymi remisy punktowe.
+
+Tabela bazowa to utrzymywana przy kazdym zakonczonym meczu tabela Standing (punkty, bilans,
+bramki) z dolaczona jednym agregatem liczba czerwonych kartek - jedno zapytanie. Mecze sa
+czytane tylko dla blokow druzyn z rowna liczba punktow, gdy kryterium jest mecz bezposredni.
+W Pythonie sortowane sa tylko druzyny z rowna liczba punktow, kolejnymi kryteriami
+z konfiguracji RANKING_TIE_BREAKERS.
+"""
+from itertools import groupby
+
+from flask import current_app, has_app_context
+from sqlalchemy import func, or_, select, true
+
+from app import db
+from app.models import Match, MatchEvent, Player, Standing, Team
+
+# Kolejnosc domyslna; kazde kryterium rozstrzyga tylko remisy pozostale po poprzednich
+TIE_BREAKERS = ('goal_difference', 'goals_for', 'head_to_head', 'wins', 'fair_play')
+
+
+class RankingRow:
+    """Wiersz tabeli - te same nazwy pol co Standing, wiec szablony obsluguja oba."""
+
+    __slots__ = ('team', 'groupNumber', 'played', 'wins', 'draws', 'losses',
+                 'goalsFor', 'goalsAgainst', 'redCards')
+
+    def __init__(self, team, groupNumber, played, wins, draws, losses, goalsFor, goalsAgainst, redCards):
+        self.team = team
+        self.groupNumber = groupNumber
+        self.played = played
+        self.wins = wins
+        self.draws = draws
+        self.losses = losses
+        self.goalsFor = goalsFor
+        self.goalsAgainst = goalsAgainst
+        self.redCards = redCards
+
+    @property
+    def team_id(self):
+        return self.team.id
+
+    @property
+    def points(self):
+        return 3 * self.wins + self.draws
+
+    @property
+    def goalDifference(self):
+        return self.goalsFor - self.goalsAgainst
+
+
+# Kryteria z tabeli bazowej - mniejszy klucz to wyzsze miejsce
+_ROW_KEYS = {
+    'goal_difference': lambda row: -row.goalDifference,
+    'goals_for': lambda row: -row.goalsFor,
+    'wins': lambda row: -row.wins,
+    # Fair play: mniej czerwonych kartek to wyzsze miejsce
+    'fair_play': lambda row: row.redCards,
+}
+
+
+def _tie_breakers(tie_breakers):
+    if tie_breakers is None:
+        tie_breakers = (current_app.config.get('RANKING_TIE_BREAKERS', TIE_BREAKERS)
+                        if has_app_context() else TIE_BREAKERS)
+    unknown = [name for name in tie_breakers if name != 'head_to_head' and name not in _ROW_KEYS]
+    if unknown:
+        raise ValueError(f"Nieznane kryteria tabeli: {', '.join(unknown)}.")
+    return tuple(tie_breakers)
+
+
+def _base_table(tournament_id, stage):
+    """Tabele wszystkich grup (liga to grupa 0) - jedno zapytanie, posortowane po punktach."""
+    # Kartka liczy sie druzynie zawodnika, jesli ta grala w meczu
+    red_cards = select(
+        Player.team_id.label('team_id'), func.count().label('redCards')
+    ).select_from(MatchEvent).join(Match, MatchEvent.match_id == Match.id).join(
+        Player, MatchEvent.player_id == Player.id
+    ).where(
+        Match.tournament_id == tournament_id, Match.status == 'ended', stage,
+        MatchEvent.eventType == 'redCard',
+        or_(Player.team_id == Match.homeTeam_id, Player.team_id == Match.awayTeam_id)
+    ).group_by(Player.team_id).subquery()
+
+    result = db.session.execute(
+        select(
+            Team, Standing.groupNumber, Standing.played, Standing.wins, Standing.draws, Standing.losses,
+            Standing.goalsFor, Standing.goalsAgainst, func.coalesce(red_cards.c.redCards, 0),
+        ).join(Team, Team.id == Standing.team_id).outerjoin(
+            red_cards, red_cards.c.team_id == Standing.team_id
+        ).where(
+            Standing.tournament_id == tournament_id
+        ).order_by(
+            Standing.groupNumber, Standing.points.desc(), Standing.team_id
+        ))
+    return [RankingRow(*row) for row in result]
+
+
+def _head_to_head_matches(tournament_id, stage, team_ids):
+    """Zakonczone mecze miedzy druzynami z remisow punktowych - jedno zapytanie dla calej tabeli."""
+    return db.session.execute(
+        select(Match.homeTeam_id, Match.awayTeam_id, Match.scoreHome, Match.scoreAway).where(
+            Match.tournament_id == tournament_id, Match.status == 'ended', stage,
+            Match.homeTeam_id.in_(team_ids), Match.awayTeam_id.in_(team_ids))).all()
+
+
+def _head_to_head_key(rows, matches):
+    """Mini-tabela meczow bezposrednich: punkty, roznica bramek, bramki strzelone."""
+    ids = {row.team_id for row in rows}
+    mini = {team_id: [0, 0, 0] for team_id in ids}
+    for home, away, score_home, score_away in matches:
+        if home not in ids or away not in ids:
+            continue
+        for team, scored, conceded in ((home, score_home, score_away), (away, score_away, score_home)):
+            mini[team][0] += 3 if scored > conceded else 1 if scored == conceded else 0
+            mini[team][1] += scored - conceded
+            mini[team][2] += scored
+    return lambda row: tuple(-value for value in mini[row.team_id])
+
+
+def _resolve(rows, tie_breakers, matches):
+    """Kolejnosc druzyn z rowna liczba punktow - kryteria po kolei, tylko dla nadal remisujacych."""
+    if len(rows) < 2 or not tie_breakers:
+        return rows
+
+    name, rest = tie_breakers[0], tie_breakers[1:]
+    key = _head_to_head_key(rows, matches) if name == 'head_to_head' else _ROW_KEYS[name]
+
+    ordered = []
+    for _, tied in groupby(sorted(rows, key=key), key=key):
+        ordered.extend(_resolve(list(tied), rest, matches))
+    return ordered
+
+
+def rank_tables(tournament, tie_breakers=None):
+    """
+    Tabele turnieju: {numer grupy: [RankingRow, ...]} od pierwszego miejsca (liga to grupa 0).
+    W turnieju grupowym licza sie tylko mecze grupowe.
+    """
+    tie_breakers = _tie_breakers(tie_breakers)
+    stage = Match.groupNumber > 0 if tournament.type == 'groups_playoff' else true()
+    rows = _base_table(tournament.id, stage)
+
+    # Bloki remisow punktowych w obrebie grupy (wiersze sa juz posortowane po punktach)
+    blocks = [list(block) for _, block in groupby(rows, key=lambda row: (row.groupNumber, row.points))]
+
+    matches = ()
+    tied_ids = [row.team_id for block in blocks if len(block) > 1 for row in block]
+    if tied_ids and 'head_to_head' in tie_breakers:
+        matches = _head_to_head_matches(tournament.id, stage, tied_ids)
+
+    tables = {}
+    for block in blocks:
+        tables.setdefault(block[0].groupNumber, []).extend(_resolve(block, tie_breakers, matches))
+    return tables
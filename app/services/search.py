@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import Counter
+
+from flask import current_app
+from sqlalchemy import event, func, or_
+
+from app.models import SEARCHABLE_MODELS
+from app.services.text import normalize_name, trigrams
+from app import db
+
+
+# Minimalne podobienstwo trigramowe, zeby wynik trafil na liste (jak pg_trgm.similarity_threshold)
+SIMILARITY_THRESHOLD = 0.3
+
+
+class NgramIndex:
+    """
+    Indeks trigramow trzymany w pamieci procesu - zamiennik pg_trgm dla SQLite.
+    Budowany leniwie jednym zapytaniem (id, searchName) i przebudowywany po zmianach w tabeli.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.names = {}
+        self.sizes = {}
+        self.postings = {}
+        self.dirty = True
+        self.built_at = 0.0
+        self.lock = threading.Lock()
+
+    def rebuild(self):
+        names = {}
+        sizes = {}
+        postings = {}
+        for id, name in db.session.query(self.model.id, self.model.searchName):
+            name = name or ''
+            grams = trigrams(name)
+            names[id] = name
+            sizes[id] = len(grams)
+            for gram in grams:
+                postings.setdefault(gram, set()).add(id)
+        self.names, self.sizes, self.postings = names, sizes, postings
+        self.dirty = False
+        self.built_at = time.monotonic()
+
+    def ensure_fresh(self, ttl):
+        # TTL chroni przed nieaktualnym indeksem, gdy zapisy przyszly z innego procesu
+        if self.dirty or time.monotonic() - self.built_at > ttl:
+            with self.lock:
+                if self.dirty or time.monotonic() - self.built_at > ttl:
+                    self.rebuild()
+
+    def search(self, text, limit):
+        """Zwraca liste (id, wynik) posortowana od najlepszego dopasowania."""
+        query_grams = trigrams(text)
+        if not query_grams:
+            return []
+
+        shared = Counter()
+        for gram in query_grams:
+            for id in self.postings.get(gram, ()):
+                shared[id] += 1
+
+        scored = []
+        for id, common in shared.items():
+            # Podobienstwo jak w pg_trgm: wspolne / (wszystkie unikalne trigramy obu napisow)
+            score = common / (len(query_grams) + self.sizes[id] - common)
+            if text in self.names[id]:
+                score += 1.0
+            if score >= SIMILARITY_THRESHOLD:
+                scored.append((id, score))
+
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+
+_indexes = {model: NgramIndex(model) for model in SEARCHABLE_MODELS}
+
+
+def _mark_dirty(mapper, connection, target):
+    _indexes[type(target)].dirty = True
+
+
+for _model in SEARCHABLE_MODELS:
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _mark_dirty)
+
+
+def _uses_pg_trgm():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def search(model, query, limit=None):
+    """
+    Wyszukuje obiekty modelu (Player, Coach, Referee, Team) po znormalizowanej nazwie.
+    Zwraca liste posortowana od najlepszego dopasowania.
+    Na PostgreSQL korzysta z indeksu GIN pg_trgm, na innych bazach z indeksu w pamieci.
+    """
+    if model not in _indexes:
+        raise ValueError(f"Model {model.__name__} nie obsługuje wyszukiwania.")
+
+    text = normalize_name(query or '')
+    if not text:
+        return []
+
+    limit = limit or current_app.config.get('SEARCH_LIMIT', 50)
+
+    if _uses_pg_trgm():
+        score = func.similarity(model.searchName, text)
+        return model.query.filter(
+            or_(model.searchName.op('%')(text),
+                model.searchName.like(f"%{text}%"))
+        ).order_by(
+            score.desc(), model.id.asc()
+        ).limit(limit).all()
+
+    index = _indexes[model]
+    index.ensure_fresh(current_app.config.get('SEARCH_INDEX_TTL', 60))
+    ranked = index.search(text, limit)
+    if not ranked:
+        return []
+
+    found = {obj.id: obj for obj in model.query.filter(
+        model.id.in_([id for id, _ in ranked]))}
+    return [found[id] for id, _ in ranked if id in found]
+
+
+def rebuild_search_names():
+    """Uzupelnia kolumne searchName dla wszystkich wierszy (np. po migracji)."""
+    updated = 0
+    for model in SEARCHABLE_MODELS:
+        for obj in model.query.all():
+            name = normalize_name(
+                *(getattr(obj, field) for field in model._search_fields))
+            if obj.searchName != name:
+                obj.searchName = name
+                updated += 1
+    db.session.commit()
+    for index in _indexes.values():
+        index.dirty = True
+    return updated
@@ -0,0 +1,104 @@
+"""
+Serializery API - recznie wypisane pola kazdego zasobu (bez refleksji po kolumnach ORM).
+Kazde pole to funkcja obiekt -> wartosc, wiec ?fields= wybiera tylko potrzebne getery.
+"""
+
+
+def _team_ref(team):
+    return {"id": team.id, "name": team.name} if team is not None else None
+
+
+def _referee_ref(referee):
+    if referee is None:
+        return None
+    return {"id": referee.id, "firstName": referee.firstName, "lastName": referee.lastName}
+
+
+class Serializer:
+    """Zestaw pol zasobu: nazwa pola -> funkcja(obiekt)."""
+
+    __slots__ = ('fields',)
+
+    def __init__(self, **fields):
+        self.fields = fields
+
+    def select(self, requested=None):
+        """Lista (nazwa, getter) dla ?fields=a,b,c (bez parametru - wszystkie pola). Nieznane pole to blad."""
+        if not requested:
+            names = list(self.fields)
+        else:
+            names = [name.strip() for name in requested.split(',') if name.strip()]
+            unknown = [name for name in names if name not in self.fields]
+            if unknown:
+                raise ValueError(
+                    f"Nieznane pola: {', '.join(unknown)}. Dostępne: {', '.join(self.fields)}.")
+        return [(name, self.fields[name]) for name in names]
+
+    def dump(self, obj, fields):
+        return {name: getter(obj) for name, getter in fields}
+
+    def dump_many(self, objects, fields):
+        return [{name: getter(obj) for name, getter in fields} for obj in objects]
+
+
+tournament_serializer = Serializer(
+    id=lambda t: t.id,
+    name=lambda t: t.name,
+    type=lambda t: t.type,
+    status=lambda t: t.status,
+    round=lambda t: t.round,
+    legs=lambda t: t.legs,
+    groups=lambda t: t.groups,
+    advancing=lambda t: t.advancing,
+    drawSeed=lambda t: t.drawSeed,
+    seedingTournament_id=lambda t: t.seedingTournament_id,
+)
+
+team_serializer = Serializer(
+    id=lambda t: t.id,
+    name=lambda t: t.name,
+    tournament_id=lambda t: t.tournament_id,
+)
+
+player_serializer = Serializer(
+    id=lambda p: p.id,
+    firstName=lambda p: p.firstName,
+    lastName=lambda p: p.lastName,
+    age=lambda p: p.age,
+    position=lambda p: p.position,
+    status=lambda p: p.status,
+    goals=lambda p: p.goals,
+    appearances=lambda p: p.appearances,
+    team_id=lambda p: p.team_id,
+)
+
+match_serializer = Serializer(
+    id=lambda m: m.id,
+    tournament_id=lambda m: m.tournament_id,
+    round=lambda m: m.round,
+    groupNumber=lambda m: m.groupNumber,
+    status=lambda m: m.status,
+    scoreHome=lambda m: m.scoreHome,
+    scoreAway=lambda m: m.scoreAway,
+    home_team=lambda m: _team_ref(m.home_team),
+    away_team=lambda m: _team_ref(m.away_team),
+    referee=lambda m: _referee_ref(m.referee),
+)
+
+slot_serializer = Serializer(
+    round=lambda s: s.round,
+    slot=lambda s: s.slot,
+    home_team=lambda s: _team_ref(s.home_team),
+    away_team=lambda s: _team_ref(s.away_team),
+    match_id=lambda s: s.match_id,
+    scoreHome=lambda s: s.match.scoreHome if s.match else None,
+    scoreAway=lambda s: s.match.scoreAway if s.match else None,
+    status=lambda s: s.match.status if s.match else None,
+)
+
+event_serializer = Serializer(
+    id=lambda e: e.id,
+    match_id=lambda e: e.match_id,
+    player_id=lambda e: e.player_id,
+    eventType=lambda e: e.eventType,
+)
@@ -1,5 +0,0 @@
-
-from . import db
-
-teams = db.get_teams()
-teams.delete_team(1)
\ No newline at end of file
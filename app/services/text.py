@@ -0,0 +1,26 @@
+import re
+import unicodedata
+
+# Litery, ktore nie rozkladaja sie w NFKD na litere + znak diakrytyczny
+_EXTRA_FOLDS = str.maketrans({'ł': 'l', 'Ł': 'l', 'ø': 'o', 'Ø': 'o', 'ß': 'ss', 'đ': 'd', 'Đ': 'd'})
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_name(*parts):
+    """
+    Zamienia imie/nazwisko/nazwe na postac do wyszukiwania:
+    male litery, bez polskich znakow i akcentow, pojedyncze spacje.
+    """
+    text = ' '.join(part for part in parts if part)
+    text = unicodedata.normalize('NFKD', text.translate(_EXTRA_FOLDS))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def trigrams(text):
+    """Zbior trigramow jak w pg_trgm - kazde slowo dopelnione dwiema spacjami z przodu i jedna z tylu."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
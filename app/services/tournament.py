@@ -1,5 +1,25 @@
-from app.models import Tournament, Team, Match
+from app.models import Tournament, Team, Match, Standing, BracketSlot
 from app import db
+from app.services.ranking import rank_tables
+from collections import defaultdict
+from sqlalchemy.orm import joinedload
+
+
+def calculate_tables(tournament_id):
+    """Tabele ligi albo wszystkich grup turnieju: {numer grupy: [wiersze od pierwszego miejsca]}."""
+    tournament = Tournament.find_tournament_by_id(tournament_id)
+    if not tournament:
+        raise ValueError("Turniej nie istnieje.")
+
+    if tournament.type not in ('league', 'groups_playoff'):
+        raise ValueError("Turniej pucharowy nie ma tabeli.")
+
+    # Tabela Standing z kartkami jednym zapytaniem, remisy punktowe rozstrzygaja kryteria RANKING_TIE_BREAKERS
+    tables = rank_tables(tournament)
+
+    if not tables:
+        raise ValueError("Brak meczów w turnieju.")
+    return tables
 
 
 def calculate_ranking(tournmanet_id):
@@ -10,36 +30,70 @@ def calculate_ranking(tournmanet_id):
     if tournament.type != 'league':
         raise ValueError("Turniej musi być ligą.")
 
-    # Pobieramy wszystkie mecze należące do turnieju
-    matches = Match.query.filter_by(tournament_id=tournament.id).all()
-    
-    if not matches:
-        raise ValueError("Brak meczów w turnieju.")
+    standings = calculate_tables(tournmanet_id)[0]
+
+    # Słownik drużyna -> punkty, w kolejności miejsc w tabeli
+    return {standing.team: standing.points for standing in standings}
 
-    # Wyznaczamy unikalne drużyny na podstawie meczów
-    teams = set()
-    for match in matches:
-        teams.add(match.home_team)
-        teams.add(match.away_team)
 
-     # Inicjalizujemy słownik do przechowywania punktów
-    ranking = {team: 0 for team in teams}
+def rebuild_standings(tournament_id=None):
+    """Odbudowuje tabele ligowe z zakonczonych meczow (dla jednego turnieju albo wszystkich)."""
+    if tournament_id is not None:
+        Tournament.find_tournament_by_id(tournament_id)
+    return Standing.rebuild(tournament_id)
 
-    # Liczymy punkty na podstawie wyników meczów
+
+def get_tournament_matches(tournament_id):
+    """Wszystkie mecze turnieju z druzynami i sedzia zaladowanymi w tym samym zapytaniu."""
+    return Match.query.options(
+        joinedload(Match.home_team),
+        joinedload(Match.away_team),
+        joinedload(Match.referee)
+    ).filter(
+        Match.tournament_id == tournament_id
+    ).order_by(Match.round.asc(), Match.id.asc()).all()
+
+
+def group_matches_by_round(matches):
+    """Grupuje mecze (albo miejsca drabinki) w rundy jednym przejsciem po liscie."""
+    rounds = defaultdict(list)
     for match in matches:
-        if match.status != 'ended':
-            continue  # Ignorujemy mecze, które się nie zakończyły
-
-        if match.scoreHome > match.scoreAway:
-            ranking[match.home_team] += 3  # 3 punkty za wygraną
-        elif match.scoreHome < match.scoreAway:
-            ranking[match.away_team] += 3  # 3 punkty za wygraną
-        else:
-            ranking[match.home_team] += 1  # 1 punkt za remis
-            ranking[match.away_team] += 1
-
-    # Sortowanie rankingu od największej liczby punktów
-    sorted_ranking = dict(
-        sorted(ranking.items(), key=lambda item: item[1], reverse=True))
-
-    return sorted_ranking
+        rounds[match.round].append(match)
+    # Mecze bez numeru rundy (stare dane ligowe) na koncu
+    return dict(sorted(rounds.items(), key=lambda item: (item[0] is None, item[0] or 0)))
+
+
+def get_tournament_details(tournament_id):
+    """
+    Zbiera dane strony turnieju: jedno zapytanie o mecze (z druzynami i sedziami)
+    oraz jedno o tabele ligowa albo drabinke play-off.
+    Zwraca None, gdy turniej nie istnieje.
+    """
+    tournament = Tournament.query.get(tournament_id)
+    if not tournament:
+        return None
+
+    matches = get_tournament_matches(tournament_id)
+
+    standings = None
+    bracket = None
+    if tournament.type in ('league', 'groups_playoff'):
+        # Tabele wszystkich grup jednym zapytaniem, po kolei wedlug numeru grupy
+        standings = [row for rows in rank_tables(tournament).values() for row in rows]
+    if tournament.type in ('playoff', 'groups_playoff'):
+        # Wszystkie miejsca drabinki, takze rund bez meczow - jedno uporzadkowane zapytanie
+        bracket = group_matches_by_round(BracketSlot.get_bracket(tournament_id))
+
+    # Kolejki fazy ligowej/grupowej; mecze drabinki pokazuje sama drabinka
+    if tournament.type == 'groups_playoff':
+        rounds = group_matches_by_round([match for match in matches if match.groupNumber])
+    else:
+        rounds = group_matches_by_round(matches)
+
+    return {
+        "tournament": tournament,
+        "matches": matches,
+        "standings": standings,
+        "bracket": bracket,
+        "rounds": rounds,
+    }
@@ -0,0 +1,266 @@
+"""
+Modele widokow stron szczegolow - zwykle slowniki (bez obiektow ORM), wiec mozna je
+trzymac w cache miedzy zapytaniami. Kazdy builder zwraca pare (slownik, tagi cache)
+albo (None, None), gdy obiekt nie istnieje.
+"""
+from flask import current_app
+from sqlalchemy import or_
+from sqlalchemy.orm import aliased, joinedload, selectinload
+
+from app import db
+from app.models import Tournament, Team, Match, MatchEvent, Player, PlayerTournamentStats, Coach, Referee
+from app.services.tournament import get_tournament_details
+
+
+def team_row(team):
+    if team is None:
+        return None
+    return {"id": team.id, "name": team.name}
+
+
+def referee_row(referee):
+    if referee is None:
+        return None
+    return {"id": referee.id, "firstName": referee.firstName, "lastName": referee.lastName}
+
+
+def player_row(player):
+    return {
+        "id": player.id,
+        "firstName": player.firstName,
+        "lastName": player.lastName,
+        "age": player.age,
+        "position": player.position,
+        "status": player.status,
+        "goals": player.goals,
+        "appearances": player.appearances,
+    }
+
+
+def leader_rows(leaders):
+    """Ranking z PlayerTournamentStats.leaderboard() - miejsca, zawodnicy z druzynami i wartosci."""
+    return [{
+        "position": position,
+        "player": {"id": player.id, "firstName": player.firstName, "lastName": player.lastName},
+        "team": team_row(player.team),
+        "value": value,
+    } for position, (player, value) in enumerate(leaders, start=1)]
+
+
+def match_row(match):
+    return {
+        "id": match.id,
+        "scoreHome": match.scoreHome,
+        "scoreAway": match.scoreAway,
+        "status": match.status,
+        "round": match.round,
+        "tournament_id": match.tournament_id,
+        "home_team": team_row(match.home_team),
+        "away_team": team_row(match.away_team),
+        "referee": referee_row(match.referee),
+    }
+
+
+# Wersje stron (ETag) - jedno male zapytanie zamiast budowania modelu widoku
+
+def tournament_revision(tournament_id, round=None):
+    # Ta sama wersja obsluguje strone turnieju i strony jego kolejek
+    return db.session.query(Tournament.revision).filter(Tournament.id == tournament_id).scalar()
+
+
+def team_revision(team_id):
+    return db.session.query(Team.revision).filter(Team.id == team_id).scalar()
+
+
+def match_revision(match_id):
+    # Strona meczu pokazuje tez nazwy druzyn
+    home, away = aliased(Team), aliased(Team)
+    row = db.session.query(Match.revision, home.revision, away.revision).join(
+        home, Match.homeTeam_id == home.id).join(
+        away, Match.awayTeam_id == away.id).filter(Match.id == match_id).first()
+    return "-".join(map(str, row)) if row else None
+
+
+def slot_row(slot):
+    match = slot.match
+    return {
+        "slot": slot.slot,
+        "home_team": team_row(slot.home_team),
+        "away_team": team_row(slot.away_team),
+        "match": {"id": match.id, "scoreHome": match.scoreHome, "scoreAway": match.scoreAway,
+                  "status": match.status} if match else None,
+    }
+
+
+def _with_teams(query):
+    return query.options(
+        joinedload(Match.home_team), joinedload(Match.away_team), joinedload(Match.referee))
+
+
+def build_tournament_view(tournament_id):
+    details = get_tournament_details(tournament_id)
+    if not details:
+        return None, None
+
+    tournament = details["tournament"]
+    rows = {match.id: match_row(match) for match in details["matches"]}
+    matches = list(rows.values())
+    standings = None
+    if details["standings"] is not None:
+        standings = [{
+            "team": team_row(standing.team),
+            "points": standing.points,
+            "wins": standing.wins,
+            "draws": standing.draws,
+            "losses": standing.losses,
+            "goalsFor": standing.goalsFor,
+            "goalsAgainst": standing.goalsAgainst,
+            "played": standing.played,
+            "group": standing.groupNumber,
+        } for standing in details["standings"]]
+
+    size = current_app.config.get('LEADERBOARD_SIZE', 10)
+    scorers = leader_rows(PlayerTournamentStats.leaderboard('goals', tournament.id, size))
+    discipline = leader_rows(PlayerTournamentStats.leaderboard('redCards', tournament.id, size))
+
+    view = {
+        "tournament": {"id": tournament.id, "name": tournament.name, "type": tournament.type,
+                       "status": tournament.status, "round": tournament.round,
+                       "drawSeed": tournament.drawSeed, "groups": tournament.groups,
+                       "advancing": tournament.advancing},
+        "matches": matches,
+        "standings": standings,
+        "rounds": {round: [rows[match.id] for match in matches_in_round]
+                   for round, matches_in_round in details["rounds"].items()},
+        "bracket": {round: [slot_row(slot) for slot in slots]
+                    for round, slots in details["bracket"].items()} if details["bracket"] else None,
+        "scorers": scorers,
+        "discipline": discipline,
+    }
+    tags = {f"tournament:{tournament.id}"}
+    tags.update(f"player:{row['player']['id']}" for row in scorers + discipline)
+    tags.update(f"referee:{match['referee']['id']}" for match in matches if match["referee"])
+    return view, tags
+
+
+def build_team_view(team_id):
+    team = Team.query.options(
+        selectinload(Team.players), selectinload(Team.teamCoach)
+    ).filter(Team.id == team_id).first()
+    if not team:
+        return None, None
+
+    # Mecze u siebie i na wyjezdzie jednym zapytaniem, z druzynami (bez N+1 w szablonie)
+    matches = _with_teams(Match.query).filter(
+        or_(Match.homeTeam_id == team_id, Match.awayTeam_id == team_id)
+    ).order_by(Match.round.asc(), Match.id.asc()).all()
+
+    coach = team.teamCoach[0] if team.teamCoach else None
+    view = {
+        "team": team_row(team),
+        "coach": {"id": coach.id, "firstName": coach.firstName, "lastName": coach.lastName} if coach else None,
+        "players": [player_row(player) for player in team.players],
+        "matches": [match_row(match) for match in matches],
+    }
+    return view, {f"team:{team.id}", f"roster:{team.id}"}
+
+
+def build_player_view(player_id):
+    player = Player.query.options(joinedload(Player.team)).filter(Player.id == player_id).first()
+    if not player:
+        return None, None
+
+    events = MatchEvent.query.options(
+        joinedload(MatchEvent.match).joinedload(Match.home_team),
+        joinedload(MatchEvent.match).joinedload(Match.away_team)
+    ).filter(MatchEvent.player_id == player_id).order_by(MatchEvent.id.asc()).all()
+
+    # Dorobek w poszczegolnych turniejach - gotowe sumy, bez przechodzenia po zdarzeniach
+    stats = PlayerTournamentStats.query.options(joinedload(PlayerTournamentStats.tournament)).filter(
+        PlayerTournamentStats.player_id == player_id
+    ).order_by(PlayerTournamentStats.tournament_id.asc()).all()
+
+    view = {
+        "player": player_row(player),
+        "team": team_row(player.team),
+        "tournaments": [{
+            "tournament": {"id": row.tournament.id, "name": row.tournament.name},
+            "goals": row.goals,
+            "redCards": row.redCards,
+            "appearances": row.appearances,
+        } for row in stats],
+        "match_events": [{
+            "id": event.id,
+            "eventType": event.eventType,
+            "match": {
+                "id": event.match.id,
+                "home_team": team_row(event.match.home_team),
+                "away_team": team_row(event.match.away_team),
+            },
+        } for event in events],
+    }
+    tags = {f"player:{player.id}"}
+    if player.team_id:
+        tags.update({f"team:{player.team_id}", f"roster:{player.team_id}"})
+    tags.update(f"match:{event.match_id}" for event in events)
+    tags.update(f"tournament:{row.tournament_id}" for row in stats)
+    return view, tags
+
+
+def build_coach_view(coach_id):
+    coach = Coach.query.options(joinedload(Coach.team)).filter(Coach.id == coach_id).first()
+    if not coach:
+        return None, None
+
+    view = {
+        "coach": {"id": coach.id, "firstName": coach.firstName, "lastName": coach.lastName,
+                  "age": coach.age},
+        "team": team_row(coach.team),
+    }
+    tags = {f"coach:{coach.id}"}
+    if coach.team_id:
+        tags.add(f"team:{coach.team_id}")
+    return view, tags
+
+
+def build_referee_view(referee_id):
+    referee = Referee.query.get(referee_id)
+    if not referee:
+        return None, None
+
+    matches = _with_teams(Match.query).filter(
+        Match.referee_id == referee_id).order_by(Match.id.asc()).all()
+
+    view = {
+        "referee": referee_row(referee),
+        "matches": [match_row(match) for match in matches],
+    }
+    tags = {f"referee:{referee.id}"}
+    tags.update(f"match:{match.id}" for match in matches)
+    # Strona pokazuje nazwy druzyn - zmiana nazwy musi ja uniewaznic
+    tags.update(f"team:{team_id}" for match in matches for team_id in (match.homeTeam_id, match.awayTeam_id))
+    return view, tags
+
+
+def build_match_view(match_id):
+    match = _with_teams(Match.query).filter(Match.id == match_id).first()
+    if not match:
+        return None, None
+
+    events = MatchEvent.query.options(joinedload(MatchEvent.player)).filter(
+        MatchEvent.match_id == match_id).order_by(MatchEvent.id.asc()).all()
+
+    view = {
+        "match": match_row(match),
+        "match_events": [{
+            "id": event.id,
+            "eventType": event.eventType,
+            "player": {"id": event.player.id, "firstName": event.player.firstName,
+                       "lastName": event.player.lastName},
+        } for event in events],
+    }
+    tags = {f"match:{match.id}", f"team:{match.homeTeam_id}", f"team:{match.awayTeam_id}"}
+    if match.referee_id:
+        tags.add(f"referee:{match.referee_id}")
+    tags.update(f"player:{event.player_id}" for event in events)
+    return view, tags
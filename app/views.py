@@ -1,8 +1,15 @@
 
-from flask import Blueprint, render_template, request, flash, redirect, url_for, session
-from .models import Tournament, Team, Match, Coach, Player, MatchEvent, Referee
+from flask import (Blueprint, Response, abort, current_app, render_template, request, flash, redirect,
+                   url_for, session)
+from .models import Tournament, Team, Match, Coach, Player, Referee
 from . import db
-from .services.tournament import calculate_ranking
+from .cache import cached, conditional
+from .live import get_broker, sse_stream
+from .services.view_models import (build_tournament_view, build_team_view, build_match_view,
+                                   build_player_view, build_coach_view, build_referee_view,
+                                   tournament_revision, team_revision, match_revision)
+from .services.pagination import paginate
+from .services.search import search
 from flask_login import login_user, login_required, logout_user, current_user
 from collections import defaultdict
 
@@ -18,6 +25,7 @@ def home():
 @views.route('/tournaments')
 def tournaments():
     query = request.args.get('query')
+    page = None
 
     # Jeśli zapytanie jest obecne, używamy metody `find_tournament` z modelu
     if query:
@@ -31,230 +39,218 @@ def tournaments():
             flash(str(e), 'danger')
             tournaments = []
     else:
-        # Jeśli brak zapytania, pobieramy wszystkie turnieje
-        tournaments = Tournament.get_tournaments()
+        # Jeśli brak zapytania, pobieramy kolejną stronę turniejów
+        try:
+            page = paginate(Tournament.get_tournaments, "name")
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('views.tournaments'))
+        tournaments = page.items
 
-    return render_template("tournaments.html", tournaments=tournaments, user=current_user)
+    return render_template("tournaments.html", tournaments=tournaments, page=page, user=current_user)
 
 @views.route('/teams')
 def teams():
     query = request.args.get('query')
+    page = None
 
-    # Jeśli zapytanie jest obecne, używamy metody `find_team` z modelu
+    # Jeśli zapytanie jest obecne, używamy wyszukiwarki (wyniki od najlepszego dopasowania)
     if query:
+        teams = search(Team, query)
+    else:
+        # Jeśli brak zapytania, pobieramy kolejną stronę drużyn
         try:
-            # Szukamy drużyny po nazwie
-            team = Team.find_team(query)
-            # Jeśli drużyna została znaleziona, zwróć ją w liście
-            teams = [team] if team else []
+            page = paginate(Team.get_teams, "name")
         except ValueError as e:
-            # Obsługa błędów, np. gdy nie znaleziono drużyny
             flash(str(e), 'danger')
-            teams = []
-    else:
-        # Jeśli brak zapytania, pobieramy wszystkie drużyny
-        teams = Team.get_teams()
+            return redirect(url_for('views.teams'))
+        teams = page.items
 
-    return render_template("teams.html", teams=teams, user=current_user)
+    return render_template("teams.html", teams=teams, page=page, user=current_user)
 
 
 @views.route('/players')
 def players():
     query = request.args.get('query')
+    page = None
 
     if query:
-        # Rozdzielamy query na imię i nazwisko, jeśli wpisano pełne imię i nazwisko
-        parts = query.split(' ', 1)
-        if len(parts) == 2:  # Jeśli podano dwa słowa
-            first_name, last_name = parts
-            players = Player.query.filter(
-                (Player.firstName.ilike(f"%{first_name}%")) &
-                (Player.lastName.ilike(f"%{last_name}%"))
-            ).all()
-        else:  # Jeśli podano jedno słowo, szukamy po imieniu lub nazwisku
-            players = Player.query.filter(
-                (Player.firstName.ilike(f"%{query}%")) |
-                (Player.lastName.ilike(f"%{query}%"))
-            ).all()
+        # Szukamy po znormalizowanym "imie nazwisko" (bez polskich znakow, indeks trigramowy)
+        players = search(Player, query)
 
         message = None if players else "Nie znaleziono zawodników"
     else:
-        players = Player.query.all()
+        try:
+            page = paginate(Player.get_players, "lastName")
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('views.players'))
+        players = page.items
         message = None
 
-    return render_template("players.html", players=players, message=message, user=current_user)
+    return render_template("players.html", players=players, message=message, page=page, user=current_user)
 
 
 @views.route('/coaches')
 def coaches():
     query = request.args.get('query')
+    page = None
 
     if query:
         # Szukamy trenera po pełnym imieniu i nazwisku lub częściowym
-        parts = query.split(' ', 1)
-        if len(parts) == 2:
-            first_name, last_name = parts
-            coaches = Coach.query.filter(
-                (Coach.firstName.ilike(f"%{first_name}%")) &
-                (Coach.lastName.ilike(f"%{last_name}%"))
-            ).all()
-        else:
-            coaches = Coach.query.filter(
-                (Coach.firstName.ilike(f"%{query}%")) |
-                (Coach.lastName.ilike(f"%{query}%"))
-            ).all()
+        coaches = Coach.find_coach(query)
     else:
-        coaches = Coach.query.all()
+        try:
+            page = paginate(Coach.get_coaches, "lastName")
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('views.coaches'))
+        coaches = page.items
 
-    return render_template("coaches.html", coaches=coaches, user=current_user)
+    return render_template("coaches.html", coaches=coaches, page=page, user=current_user)
 
 
 @views.route('/referees')
 def referees():
     query = request.args.get('query')
+    page = None
 
     if query:
-        try:
-            # Szukamy sędziego na podstawie zapytania
-            referee = Referee.find_ref(query)
-            referees = [referee] if referee else []
+        # Szukamy sędziów na podstawie zapytania
+        referees = search(Referee, query)
 
-            if not referee:
-                flash("Nie znaleziono sędziego.", 'danger')
-        except ValueError as e:
-            flash("Błąd w przetwarzaniu zapytania: " + str(e), 'danger')
-            referees = []
+        if not referees:
+            flash("Nie znaleziono sędziego.", 'danger')
     else:
-        referees = Referee.get_refs()
-    return render_template("referees.html", referees=referees, user=current_user)
+        try:
+            page = paginate(Referee.get_refs, "lastName")
+        except ValueError as e:
+            flash(str(e), 'danger')
+            return redirect(url_for('views.referees'))
+        referees = page.items
+    return render_template("referees.html", referees=referees, page=page, user=current_user)
 
 @views.route('/referee/<int:referee_id>')
 def referee_details(referee_id):
-    referee = Referee.query.get(referee_id)
-    matches = Match.query.filter(Match.referee_id == referee_id)
-    
-    return render_template("referee_details.html", referee=referee, user=current_user, matches = matches)
+    view = cached(f"referee:{referee_id}", lambda: build_referee_view(referee_id))
+
+    if not view:
+        flash("Sędzia nie istnieje", "danger")
+        return redirect(url_for('views.referees'))
+
+    return render_template("referee_details.html", user=current_user, **view)
 
 # detale dla stron --------------------------------------------------------------------------------------------------------
 
 
 @views.route('/tournament/<int:tournament_id>')
+@conditional(tournament_revision)
 def tournament_details(tournament_id):
-    tournament = Tournament.query.get(tournament_id)
+    # Wszystkie dane strony pobierane w serwisie - bez dociagania druzyn w szablonie
+    view = cached(f"tournament:{tournament_id}", lambda: build_tournament_view(tournament_id))
 
-    if not tournament:
+    if not view:
         flash("Turniej nie istnieje", "danger")
         return redirect(url_for('views.tournaments'))
 
-    ranking = None
-    rounds = None
+    return render_template(
+        "tournament_details.html",
+        user=current_user,
+        **view
+    )
 
-    # Logika dla turniejów ligowych
-    if tournament.type == 'league':
-        ranking = calculate_ranking(tournament_id)
 
-    # Logika dla turniejów typu playoff
-    elif tournament.type == 'playoff':
-        matches = Match.query.filter_by(tournament_id=tournament_id).all()
-        # Grupujemy mecze według rundy
-        rounds = {r: [m for m in matches if m.round == r]
-                  for r in range(1, tournament.round + 1)}
+@views.route('/tournament/<int:tournament_id>/round/<int:round>')
+@conditional(tournament_revision)
+def tournament_round(tournament_id, round):
+    tournament = Tournament.query.get(tournament_id)
 
-    # Pobieramy wszystkie mecze
-    matches = Match.query.filter(Match.tournament_id == tournament_id).all()
+    if not tournament:
+        flash("Turniej nie istnieje", "danger")
+        return redirect(url_for('views.tournaments'))
+
+    # Jedna kolejka/runda - odczyt z indeksu (tournament_id, round)
+    matches = Match.get_round(tournament_id, round, group_stage=tournament.type == 'groups_playoff')
 
     return render_template(
-        "tournament_details.html",
+        "tournament_round.html",
         tournament=tournament,
-        ranking=ranking,
+        round=round,
         matches=matches,
-        rounds=rounds,
         user=current_user
     )
 
 
 @views.route('/team/<int:team_id>')
+@conditional(team_revision)
 def team_details(team_id):
-    # Pobieramy drużynę na podstawie ID
-    team = Team.query.get(team_id)
+    # Model widoku (drużyna, trener, zawodnicy, mecze) z cache albo zbudowany kilkoma zapytaniami
+    view = cached(f"team:{team_id}", lambda: build_team_view(team_id))
 
-    if not team:
+    if not view:
         flash("Drużyna nie istnieje", "danger")
         return redirect(url_for('views.tournaments'))
 
-    # Pobieramy trenera drużyny
-    coach = team.teamCoach
-
-    # Pobieramy zawodników drużyny
-    players = team.players
-
-    # Pobieramy mecze drużyny (zarówno jako gospodarze, jak i goście)
-    matches = team.home_matches + team.away_matches
-
-    return render_template(
-        "team_details.html",
-        team=team,
-        coach=coach,
-        players=players,
-        matches=matches,
-        user=current_user
-    )
+    return render_template("team_details.html", user=current_user, **view)
 
 
 @views.route('/match/<int:match_id>')
+@conditional(match_revision)
 def match_details(match_id):
-    match = Match.query.get(match_id)
+    view = cached(f"match:{match_id}", lambda: build_match_view(match_id))
 
-    if not match:
+    if not view:
         flash("Mecz nie istnieje", "danger")
         return redirect(url_for('views.tournaments'))
 
-    # Pobieramy wydarzenia związane z meczem
-    match_events = MatchEvent.query.filter_by(match_id=match_id).all()
-
-    return render_template("match_details.html", match=match, match_events=match_events, user=current_user)
+    return render_template("match_details.html", user=current_user, **view)
 
 
 @views.route('/player/<int:player_id>')
 def player_details(player_id):
-    # Pobieramy zawodnika na podstawie ID
-    player = Player.query.get(player_id)
+    view = cached(f"player:{player_id}", lambda: build_player_view(player_id))
 
-    if not player:
+    if not view:
         flash("Zawodnik nie istnieje", "danger")
         return redirect(url_for('views.players'))
 
-    # Pobieramy drużynę zawodnika
-    team = player.team
-
-    # Pobieramy MatchEventy zawodnika
-    match_events = player.playerEvents
-
-    return render_template(
-        "player_details.html",
-        player=player,
-        team=team,
-        match_events=match_events,
-        user=current_user
-    )
+    return render_template("player_details.html", user=current_user, **view)
 
 
 @views.route('/coach/<int:coach_id>')
 def coach_details(coach_id):
-    coach = Coach.query.get(coach_id)
+    view = cached(f"coach:{coach_id}", lambda: build_coach_view(coach_id))
 
-    if not coach:
+    if not view:
         flash("Trener nie istnieje", "danger")
         return redirect(url_for('views.coaches'))
 
-    team = coach.team  # Relacja z modelem `Team`
+    return render_template("coach_details.html", user=current_user, **view)
+
+# Wyniki na zywo (SSE) ------------------------------------------------------------------------------------------
+
+def _live_response(channel):
+    # Strumien dostaje sam broker - nie trzyma kontekstu zapytania ani sesji bazy
+    stream = sse_stream(get_broker(), channel, current_app.config.get('LIVE_KEEPALIVE', 15))
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@views.route('/tournament/<int:tournament_id>/live')
+def tournament_live(tournament_id):
+    if not db.session.get(Tournament, tournament_id):
+        abort(404)
+    return _live_response(f"tournament:{tournament_id}")
+
+
+@views.route('/match/<int:match_id>/live')
+def match_live(match_id):
+    if not db.session.get(Match, match_id):
+        abort(404)
+    return _live_response(f"match:{match_id}")
 
-    return render_template(
-        "coach_details.html",
-        coach=coach,
-        team=team,
-        user=current_user
-    )
 
 # FUNCJONALNOŚĆ TWORZENIA ---------------------------------------------------------------------------------------------------------------------
 
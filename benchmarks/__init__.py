@@ -0,0 +1 @@
+"""Skrypty do pomiaru wydajnosci - uruchamiane jako `python -m benchmarks.<nazwa>`."""
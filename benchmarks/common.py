@@ -0,0 +1,13 @@
+from app import create_app, db
+
+
+def make_app(database_uri='sqlite://', **config):
+    """Aplikacja profilu bench z podana baza i utworzonym schematem (SQLite w pamieci domyslnie)."""
+    if database_uri != 'sqlite://':
+        config['SQLALCHEMY_DATABASE_URI'] = database_uri
+        config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+
+    app = create_app(config, profile='bench')
+    with app.app_context():
+        db.create_all()
+    return app
@@ -0,0 +1,48 @@
+"""
+Porownanie dwoch plikow wynikow benchmarks.suite (np. z dwoch commitow) po medianach.
+
+    python -m benchmarks.compare stare.json nowe.json
+    python -m benchmarks.compare stare.json nowe.json --threshold 1.10   # kod 1, gdy cos zwolnilo o >10%
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('base')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Maksymalny dopuszczalny stosunek median nowe/stare.')
+    args = parser.parse_args()
+
+    base, new = load(args.base), load(args.new)
+    if base['meta']['params'] != new['meta']['params']:
+        print(f"UWAGA: rozne parametry: {base['meta']['params']} / {new['meta']['params']}")
+
+    print(f"{(base['meta']['commit'] or '?')[:10]} -> {(new['meta']['commit'] or '?')[:10]}")
+    print(f"{'scenariusz':<45} {'stare [ms]':>11} {'nowe [ms]':>10} {'nowe/stare':>11}")
+    slower = []
+    for name, stats in new['results'].items():
+        before = base['results'].get(name)
+        if before is None:
+            print(f"{name:<45} {'-':>11} {stats['median'] * 1000:>10.2f} {'nowy':>11}")
+            continue
+        ratio = stats['median'] / before['median'] if before['median'] else float('inf')
+        print(f"{name:<45} {before['median'] * 1000:>11.2f} {stats['median'] * 1000:>10.2f} {ratio:>11.2f}")
+        if args.threshold is not None and ratio > args.threshold:
+            slower.append(name)
+
+    if slower:
+        print(f"Wolniej niz {args.threshold}x: {', '.join(slower)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
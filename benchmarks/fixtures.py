@@ -0,0 +1,75 @@
+"""
+Czas i pamiec generowania terminarza ligi albo drabinki play-off (Tournament.generate_matches).
+
+    python -m benchmarks.fixtures --teams 20 200 1000 --batch-size 1000
+    python -m benchmarks.fixtures --legacy     # dodatkowo stara sciezka: lista obiektow Match + add_all
+    python -m benchmarks.fixtures --type playoff --teams 1000 1025 4096
+"""
+import argparse
+import time
+import tracemalloc
+from itertools import permutations
+
+from app import db
+from app.models import BracketSlot, Match, Team, Tournament
+from benchmarks.common import make_app
+
+
+def legacy_generate(tournament):
+    """Poprzednia implementacja: wszystkie mecze jako obiekty ORM w jednej liscie."""
+    matches = []
+    for home_team, away_team in permutations(Tournament.get_teams(tournament.id), 2):
+        matches.append(Match(homeTeam_id=home_team.id, awayTeam_id=away_team.id,
+                             tournament_id=tournament.id, status='planned'))
+    db.session.add_all(matches)
+    db.session.commit()
+
+
+def create_tournament(n_teams, label, type='league'):
+    tournament = Tournament(name=f"bench-{label}-{n_teams}", type=type, status='planned', drawSeed=n_teams)
+    db.session.add(tournament)
+    db.session.flush()
+    db.session.add_all(Team(name=f"bench-{label}-{n_teams}-{i}", tournament_id=tournament.id)
+                       for i in range(n_teams))
+    db.session.commit()
+    return tournament.id
+
+
+def measure(generate, tournament_id):
+    db.session.expunge_all()
+    tournament = db.session.get(Tournament, tournament_id)
+    tracemalloc.start()
+    start = time.perf_counter()
+    generate(tournament)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = Match.query.filter_by(tournament_id=tournament_id).count()
+    slots = BracketSlot.query.filter_by(tournament_id=tournament_id).count()
+    return elapsed, peak, count, slots
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-uri', default='sqlite://')
+    parser.add_argument('--teams', type=int, nargs='+', default=[20, 200, 1000])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--legacy', action='store_true')
+    parser.add_argument('--type', choices=['league', 'playoff'], default='league')
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri, FIXTURE_BATCH_SIZE=args.batch_size)
+    with app.app_context():
+        print(f"{'path':>10} {'teams':>6} {'matches':>9} {'slots':>6} {'time [s]':>9} {'peak [MB]':>10}")
+        for n_teams in args.teams:
+            paths = [('streaming', Tournament.generate_matches)]
+            if args.legacy and args.type == 'league':
+                paths.append(('legacy', legacy_generate))
+            for label, generate in paths:
+                tournament_id = create_tournament(n_teams, label, args.type)
+                elapsed, peak, count, slots = measure(generate, tournament_id)
+                print(f"{label:>10} {n_teams:>6} {count:>9} {slots:>6} {elapsed:>9.3f} {peak / 2**20:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Deterministyczny generator danych turniejowych dla benchmarkow.
+
+Ten sam seed daje te same druzyny, zawodnikow, terminarze, wyniki i zdarzenia. Dane
+powstaja przez modele i serwisy aplikacji (add_teams, generate_matches, finish_matchday),
+wiec tabele, statystyki zawodnikow i drabinki sa utrzymywane tak jak w dzialajacej aplikacji.
+"""
+from random import Random
+
+from sqlalchemy import update
+
+from app import db
+from app.models import Coach, Match, Player, Referee, Team, Tournament
+from app.services.match import finish_matchday
+
+FIRST_NAMES = ['Jan', 'Piotr', 'Paweł', 'Łukasz', 'Michał', 'Krzysztof', 'Tomasz', 'Józef', 'Mateusz', 'Zbigniew']
+LAST_NAMES = ['Kowalski', 'Nowak', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski', 'Zieliński',
+              'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski', 'Jankowski', 'Mazur', 'Krawczyk']
+
+
+class Generator:
+    """
+    Tworzy turnieje z druzynami, zawodnikami i rozegranymi meczami. Kolejne wywolania
+    (np. swiezy turniej dla kazdego powtorzenia scenariusza) ciagna z tego samego
+    generatora liczb losowych, wiec caly przebieg zalezy tylko od seed.
+    """
+
+    def __init__(self, seed=0, players=11, label='bench'):
+        self.rng = Random(seed)
+        self.seed = seed
+        self.players = players
+        self.label = label
+        self.counter = 0
+        self.referee_id = None
+
+    def _name(self, kind):
+        self.counter += 1
+        return f"{self.label}-{kind}-{self.seed}-{self.counter}"
+
+    def referee(self):
+        if self.referee_id is None:
+            referee = Referee(firstName=self.rng.choice(FIRST_NAMES), lastName=self.rng.choice(LAST_NAMES),
+                              age=self.rng.randint(25, 60))
+            db.session.add(referee)
+            db.session.commit()
+            self.referee_id = referee.id
+        return self.referee_id
+
+    def teams(self, n):
+        """n druzyn z trenerami i skladami (self.players zawodnikow z pola, dwoch rezerwowych)."""
+        teams = [Team(name=self._name('team')) for _ in range(n)]
+        db.session.add_all(teams)
+        db.session.flush()
+
+        for team in teams:
+            db.session.add(Coach(firstName=self.rng.choice(FIRST_NAMES), lastName=self.rng.choice(LAST_NAMES),
+                                 age=self.rng.randint(30, 70), login=self._name('coach')[-30:],
+                                 password='bench', team_id=team.id))
+            db.session.add_all(Player(
+                firstName=self.rng.choice(FIRST_NAMES),
+                lastName=self.rng.choice(LAST_NAMES),
+                age=self.rng.randint(16, 40),
+                position='field' if i < self.players else 'substitute',
+                status='active',
+                goals=0,
+                appearances=0,
+                team_id=team.id,
+            ) for i in range(self.players + 2))
+        db.session.commit()
+        return teams
+
+    def tournament(self, type='league', n_teams=16, legs=2, schedule=True):
+        """
+        Turniej z druzynami i wygenerowanym terminarzem (albo drabinka), z sedzia w kazdym
+        meczu. Z schedule=False tylko turniej z druzynami - do pomiaru samego generowania.
+        """
+        tournament = Tournament(name=self._name(type), type=type, status='planned',
+                                round=None if type == 'league' else 1, legs=legs,
+                                drawSeed=self.rng.getrandbits(32))
+        db.session.add(tournament)
+        db.session.commit()
+
+        Tournament.add_teams(tournament.name, self.teams(n_teams))
+        if schedule:
+            Tournament.generate_matches(tournament)
+            self.assign_referee(tournament.id)
+        return tournament.id
+
+    def assign_referee(self, tournament_id):
+        db.session.execute(update(Match).where(
+            Match.tournament_id == tournament_id, Match.referee_id.is_(None)
+        ).values(referee_id=self.referee()))
+        db.session.commit()
+
+    def results(self, matches):
+        """
+        Losowe rekordy wynikow dla finish_matchday: gole przypisane zawodnikom z pola
+        strzelajacej druzyny i od czasu do czasu czerwona kartka. Mecze pucharowe bez remisow.
+        """
+        team_ids = {team_id for match in matches for team_id in (match.homeTeam_id, match.awayTeam_id)}
+        squads = {}
+        for player_id, team_id in db.session.query(Player.id, Player.team_id).filter(
+                Player.team_id.in_(team_ids), Player.position == 'field').order_by(Player.id):
+            squads.setdefault(team_id, []).append(player_id)
+
+        records = []
+        for match in matches:
+            score_home, score_away = self.rng.randint(0, 4), self.rng.randint(0, 4)
+            if match.is_knockout and score_home == score_away:
+                score_home += 1
+            events = []
+            for team_id, goals in ((match.homeTeam_id, score_home), (match.awayTeam_id, score_away)):
+                squad = squads.get(team_id)
+                if not squad:
+                    continue
+                events += [('goal', self.rng.choice(squad)) for _ in range(goals)]
+                if self.rng.random() < 0.1:
+                    events.append(('redCard', self.rng.choice(squad)))
+            records.append({'match_id': match.id, 'scoreHome': score_home,
+                            'scoreAway': score_away, 'events': events})
+        return records
+
+    def play_round(self, tournament_id, round):
+        """Konczy wszystkie zaplanowane mecze rundy (kolejki) jedna paczka finish_matchday."""
+        matches = Match.query.filter(
+            Match.tournament_id == tournament_id, Match.round == round, Match.status == 'planned'
+        ).order_by(Match.id).all()
+        if matches:
+            finish_matchday(self.results(matches))
+            # Mecze nastepnej rundy drabinki powstaja przy konczeniu meczow - bez sedziego
+            self.assign_referee(tournament_id)
+        return len(matches)
+
+
+def generate(seed=0, tournaments=2, teams=16, players=11, played_rounds=None):
+    """
+    Zestaw danych do benchmarkow: na przemian ligi i turnieje play-off po `teams` druzyn.
+    W ligach rozegrana jest polowa kolejek (albo played_rounds), w play-off pierwsza runda.
+    Zwraca slownik z identyfikatorami: leagues, playoffs, referee.
+    """
+    generator = Generator(seed, players)
+    data = {'leagues': [], 'playoffs': [], 'referee': generator.referee()}
+
+    for i in range(tournaments):
+        type = 'league' if i % 2 == 0 else 'playoff'
+        tournament_id = generator.tournament(type, teams)
+        if type == 'league':
+            rounds = db.session.query(db.func.max(Match.round)).filter(
+                Match.tournament_id == tournament_id).scalar() or 0
+            for round in range(1, (rounds // 2 if played_rounds is None else played_rounds) + 1):
+                generator.play_round(tournament_id, round)
+            data['leagues'].append(tournament_id)
+        else:
+            generator.play_round(tournament_id, 1)
+            data['playoffs'].append(tournament_id)
+
+    data['generator'] = generator
+    return data
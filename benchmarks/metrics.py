@@ -0,0 +1,81 @@
+"""
+Narzut metryk zadan (app/metrics.py) na jedno zadanie. Dwie aplikacje - z METRICS_ENABLED
+i bez - przechodza te sama sciezke Flaska: haki before_request, render() malego szablonu
+i haki after_request (bez routingu i widoku, ktore metryk nie dotycza).
+Po rozgrzewce obie aplikacje mierzone sa na zmiane, a narzut to mediana roznic z kolejnych
+powtorzen - pojedyncze zaklocenia (inne procesy, GC) nie przesadzaja o wyniku porownania
+z budzetem. Na koniec koszt odczytu /metrics.
+
+    python -m benchmarks.metrics
+    python -m benchmarks.metrics --requests 200000 --repeat 9 --budget 25   # kod 1 ponad 25 us
+"""
+import argparse
+import gc
+import statistics
+import time
+
+from flask import Response
+
+from benchmarks.common import make_app
+
+URLS = ['/', '/tournaments', '/tournament/1', '/team/1', '/api/v1/matches', '/admin/home-admin', '/auth/login']
+
+
+def run(app, requests):
+    """Sredni czas [s] na zadanie przy `requests` zadaniach rozlozonych na URLS."""
+    response = Response('x' * 2048)
+    # Szablon skompilowany raz (jak szablony z katalogu templates po pierwszym uzyciu)
+    template = app.jinja_env.from_string('{{ value }}')
+    per_url = max(requests // len(URLS), 1)
+    elapsed = 0.0
+    # Jak timeit: zbieranie smieci w trakcie pomiaru dokladaloby szum z poprzednich przebiegow
+    gc.collect()
+    gc.disable()
+    try:
+        for url in URLS:
+            with app.test_request_context(url):
+                start = time.perf_counter()
+                for _ in range(per_url):
+                    app.preprocess_request()
+                    template.render(value=1)
+                    app.process_response(response)
+                elapsed += time.perf_counter() - start
+    finally:
+        gc.enable()
+    return elapsed / (per_url * len(URLS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--budget', type=float, default=25.0, help='Dopuszczalny narzut na zadanie [us].')
+    args = parser.parse_args()
+
+    apps = {'bez metryk': make_app(METRICS_ENABLED=False), 'z metrykami': make_app()}
+    # Rozgrzewka: pierwsze przebiegi ciagna leniwe inicjalizacje (etykiety, kopie licznikow)
+    for app in apps.values():
+        run(app, args.requests // 10)
+    times = {name: [] for name in apps}
+    for i in range(args.repeat):
+        # Kolejnosc na zmiane, zeby dryf maszyny nie obciazal stale jednej aplikacji
+        for name in sorted(apps, reverse=i % 2 == 1):
+            times[name].append(run(apps[name], args.requests))
+    overhead = statistics.median(
+        with_metrics - without for without, with_metrics in zip(times['bez metryk'], times['z metrykami'])) * 1e6
+
+    registry = apps['z metrykami'].extensions['metrics']
+    start = time.perf_counter()
+    body = registry.render()
+    scrape = time.perf_counter() - start
+
+    for name, values in times.items():
+        print(f"{name:>12}: {statistics.median(values) * 1e6:8.2f} us/zadanie (min {min(values) * 1e6:.2f})")
+    print(f"narzut metryk (mediana z {args.repeat}): {overhead:.2f} us/zadanie (budzet {args.budget:.0f} us)")
+    print(f"odczyt /metrics: {scrape * 1000:.2f} ms, {len(body.splitlines())} linii")
+    if overhead > args.budget:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
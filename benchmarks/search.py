@@ -0,0 +1,93 @@
+"""
+Porownanie wyszukiwarki (indeks trigramow / pg_trgm) z poprzednim filtrem ILIKE '%x%'.
+
+    python -m benchmarks.search --players 20000 --queries 200
+    python -m benchmarks.search --database-uri postgresql://... (pg_trgm)
+"""
+import argparse
+import random
+import time
+
+from app import db
+from app.models import Player
+from app.services.search import search
+from benchmarks.common import make_app
+
+FIRST_NAMES = ['Jan', 'Piotr', 'Paweł', 'Łukasz', 'Michał', 'Krzysztof', 'Tomasz', 'Józef', 'Mateusz', 'Zbigniew']
+LAST_NAMES = ['Kowalski', 'Nowak', 'Wiśniewski', 'Wójcik', 'Kowalczyk', 'Kamiński', 'Lewandowski', 'Zieliński',
+              'Szymański', 'Woźniak', 'Dąbrowski', 'Kozłowski', 'Jankowski', 'Mazur', 'Krawczyk']
+
+
+def ilike_search(query):
+    """Poprzednia implementacja widoku /players."""
+    parts = query.split(' ', 1)
+    if len(parts) == 2:
+        first_name, last_name = parts
+        return Player.query.filter(
+            (Player.firstName.ilike(f"%{first_name}%")) &
+            (Player.lastName.ilike(f"%{last_name}%"))
+        ).all()
+    return Player.query.filter(
+        (Player.firstName.ilike(f"%{query}%")) |
+        (Player.lastName.ilike(f"%{query}%"))
+    ).all()
+
+
+def seed_players(n, rng):
+    for i in range(n):
+        db.session.add(Player(
+            firstName=rng.choice(FIRST_NAMES),
+            lastName=f"{rng.choice(LAST_NAMES)}{i}",
+            age=rng.randint(16, 40),
+            status='active',
+            goals=0,
+            appearances=0
+        ))
+    db.session.commit()
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    hits = 0
+    for query in queries:
+        hits += len(fn(query))
+        db.session.expunge_all()
+    elapsed = time.perf_counter() - start
+    return elapsed, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database-uri', default='sqlite://')
+    parser.add_argument('--players', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        if not Player.query.first():
+            seed_players(args.players, rng)
+
+        queries = [f"{rng.choice(LAST_NAMES)[:rng.randint(3, 6)]}" for _ in range(args.queries)]
+        queries += [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)[:4]}" for _ in range(args.queries)]
+
+        # Pierwsze wywolanie buduje indeks w pamieci - mierzymy je osobno
+        start = time.perf_counter()
+        search(Player, queries[0])
+        warmup = time.perf_counter() - start
+
+        results = {
+            'ilike': timed(ilike_search, queries),
+            'trigram': timed(lambda q: search(Player, q), queries),
+        }
+
+        print(f"backend: {db.engine.dialect.name}, players: {Player.query.count()}, queries: {len(queries)}")
+        print(f"trigram index warm-up: {warmup * 1000:.1f} ms")
+        for name, (elapsed, hits) in results.items():
+            print(f"{name:>8}: {elapsed * 1000 / len(queries):8.3f} ms/query, {hits} hits")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""
+Zestaw benchmarkow na deterministycznych danych (benchmarks.generator).
+
+Scenariusze: ranking ligi, generowanie terminarza i drabinki, przejscie do nastepnej rundy
+play-off, wpisywanie wynikow kolejki i kazda publiczna strona przez klienta testowego Flask.
+Wyniki (czasy w sekundach) trafiaja do pliku JSON, ktory mozna porownac z wynikami
+z innego commita: python -m benchmarks.compare stare.json nowe.json
+
+    python -m benchmarks.suite --output bench.json
+    python -m benchmarks.suite --seed 7 --tournaments 4 --teams 20 --repeat 10 --only ranking page:
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import sqlalchemy
+
+from app import db
+from app.models import Coach, Match, Player, Team, Tournament
+from app.services.match import finish_matchday
+from app.services.tournament import calculate_ranking
+from benchmarks.common import make_app
+from benchmarks.generator import generate
+
+
+def scenarios(app, data, teams):
+    """
+    Slownik nazwa -> przygotowanie. Przygotowanie (poza pomiarem) zwraca funkcje bez
+    argumentow, ktorej czas jest mierzony - scenariusze zmieniajace dane dostaja
+    przy kazdym powtorzeniu swiezy turniej.
+    """
+    generator = data['generator']
+    league_id, playoff_id = data['leagues'][0], data['playoffs'][0]
+
+    def ranking():
+        return lambda: calculate_ranking(league_id)
+
+    def fixtures(type):
+        def prepare():
+            tournament_id = generator.tournament(type, teams, schedule=False)
+            return lambda: Tournament.generate_matches(db.session.get(Tournament, tournament_id))
+        return prepare
+
+    def next_round():
+        tournament_id = generator.tournament('playoff', teams)
+        return lambda: generator.play_round(tournament_id, 1)
+
+    def result_entry():
+        tournament_id = generator.tournament('league', teams)
+        matches = Match.query.filter_by(tournament_id=tournament_id, round=1).all()
+        records = generator.results(matches)
+        return lambda: finish_matchday(records)
+
+    # Publiczne strony - przykladowe obiekty z wygenerowanych danych
+    match_id = db.session.query(Match.id).filter(
+        Match.tournament_id == league_id, Match.status == 'ended').order_by(Match.id).limit(1).scalar()
+    team_id = db.session.query(Team.id).filter(Team.tournament_id == league_id).order_by(Team.id).limit(1).scalar()
+    player_id = db.session.query(Player.id).filter(Player.team_id == team_id).order_by(Player.id).limit(1).scalar()
+    coach_id = db.session.query(Coach.id).filter(Coach.team_id == team_id).limit(1).scalar()
+    pages = [
+        '/', '/tournaments', '/teams', '/players', '/coaches', '/referees',
+        '/players?query=Kowalski',
+        f'/tournament/{league_id}', f'/tournament/{league_id}/round/1', f'/tournament/{playoff_id}',
+        f'/team/{team_id}', f'/match/{match_id}', f'/player/{player_id}', f'/coach/{coach_id}',
+        f"/referee/{data['referee']}",
+    ]
+    client = app.test_client()
+
+    def page(url):
+        def prepare():
+            def get():
+                response = client.get(url)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{url}: HTTP {response.status_code}")
+            return get
+        return prepare
+
+    result = {
+        'ranking': ranking,
+        'fixtures:league': fixtures('league'),
+        'fixtures:playoff': fixtures('playoff'),
+        'next_round:playoff': next_round,
+        'result_entry:matchday': result_entry,
+    }
+    result.update((f"page:{url}", page(url)) for url in pages)
+    return result
+
+
+def run(prepare, repeat):
+    times = []
+    for _ in range(repeat):
+        fn = prepare()
+        db.session.expunge_all()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        db.session.rollback()
+    return {
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'max': max(times),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database-uri', default='sqlite://')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tournaments', type=int, default=2, help='Liczba turniejow (na przemian liga i play-off).')
+    parser.add_argument('--teams', type=int, default=16)
+    parser.add_argument('--players', type=int, default=11, help='Zawodnicy z pola w druzynie.')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cache', default='null', help="Backend cache stron (domyslnie 'null' - bez cache).")
+    parser.add_argument('--only', nargs='+', default=None, help='Tylko scenariusze o nazwach zaczynajacych sie tak.')
+    parser.add_argument('--output', default=None, help='Plik JSON z wynikami.')
+    args = parser.parse_args()
+
+    app = make_app(args.database_uri, CACHE_BACKEND=args.cache)
+    with app.app_context():
+        start = time.perf_counter()
+        data = generate(args.seed, max(args.tournaments, 2), args.teams, args.players)
+        print(f"dane: {time.perf_counter() - start:.2f} s")
+
+        results = {}
+        print(f"{'scenariusz':<45} {'min [ms]':>10} {'mediana [ms]':>13} {'max [ms]':>10}")
+        for name, prepare in scenarios(app, data, args.teams).items():
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            results[name] = run(prepare, args.repeat)
+            stats = results[name]
+            print(f"{name:<45} {stats['min'] * 1000:>10.2f} {stats['median'] * 1000:>13.2f} {stats['max'] * 1000:>10.2f}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'database': sqlalchemy.engine.make_url(args.database_uri).get_backend_name(),
+            'params': {'seed': args.seed, 'tournaments': args.tournaments, 'teams': args.teams,
+                       'players': args.players, 'repeat': args.repeat, 'cache': args.cache},
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"zapisano {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import event
+
+from app import create_app, db
+
+
+@pytest.fixture
+def app():
+    """Aplikacja profilu testing - SQLite w pamieci ze schematem, cache stron wylaczony."""
+    app = create_app(profile='testing')
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Liczba zapytan SQL wykonanych przez funkcje: count_queries(lambda: client.get(url))."""
+    def count(fn):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            result = fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return len(statements), result
+    return count
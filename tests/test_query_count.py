@@ -0,0 +1,30 @@
+"""Liczba zapytan strony turnieju nie moze rosnac z liczba druzyn i meczow (regresje N+1)."""
+import pytest
+
+from app import db
+from app.models import Match
+from benchmarks.generator import Generator
+
+
+def _tournament(type, teams, played_rounds):
+    generator = Generator(seed=teams, players=3, label='test')
+    tournament_id = generator.tournament(type, teams)
+    for round in range(1, played_rounds + 1):
+        generator.play_round(tournament_id, round)
+    return tournament_id
+
+
+def _page_queries(client, count_queries, tournament_id):
+    db.session.expunge_all()
+    queries, response = count_queries(lambda: client.get(f'/tournament/{tournament_id}'))
+    assert response.status_code == 200
+    return queries
+
+
+@pytest.mark.parametrize('type, played_rounds', [('league', 2), ('playoff', 1)])
+def test_tournament_page_query_count_does_not_grow(app, client, count_queries, type, played_rounds):
+    small = _tournament(type, 4, played_rounds)
+    large = _tournament(type, 16, played_rounds)
+    assert Match.query.filter_by(tournament_id=large).count() > Match.query.filter_by(tournament_id=small).count()
+
+    assert _page_queries(client, count_queries, small) == _page_queries(client, count_queries, large)